@@ -1,9 +1,33 @@
 import streamlit as st
 import datetime
+import uuid
+
+from calc_engine import FUNCTIONS, ExpressionError, compile_expression, evaluate
+from calc_history import HistoryStore, log_path
+
+
+# --- History (one per user, bounded in memory, persisted to calc_history/<id>.jsonl) ---
+# The id lives in the page URL, so a reload keeps the same history while
+# other users (other URLs) never see it.
+def history_id():
+    user_id = st.query_params.get("history")
+    try:
+        log_path(user_id or "")
+    except ValueError:
+        user_id = uuid.uuid4().hex
+        st.query_params["history"] = user_id
+    return user_id
+
+
+# One store per id for the whole server, so tabs and reloads of the same
+# URL see each other's entries straight away
+@st.cache_resource(max_entries=1000)
+def get_history(user_id):
+    return HistoryStore(log_path(user_id))
+
 
-# --- Session History ---
 if "history" not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = get_history(history_id())
 
 # --- Page Title ---
 st.set_page_config(page_title="NeuroCalc AI", page_icon="🧮")
@@ -28,33 +52,44 @@ option = st.sidebar.radio("📘 Choose Function", [
     "Calculation History",
     "Percentage Calculator",
     "Date Difference Calculator",
+    "Bulk Mode (CSV)",
 ])
 
 # --- Basic Calculator ---
 if option == "Basic Calculator":
     st.subheader("🔢 Basic Calculator")
-    num1 = st.number_input("Enter first number:", step=0.1, format="%.1f")
-    operator = st.selectbox("Choose operator:", ["+", "-", "*", "/"])
-    num2 = st.number_input("Enter second number:", step=0.1, format="%.1f")
-    
+    mode = st.radio("Mode", ["Two numbers", "Expression"], horizontal=True)
+
+    if mode == "Two numbers":
+        num1 = st.number_input("Enter first number:", step=0.1, format="%.1f")
+        operator = st.selectbox("Choose operator:", ["+", "-", "*", "/"])
+        num2 = st.number_input("Enter second number:", step=0.1, format="%.1f")
+        expression = f"a {operator} b"
+        values = {"a": num1, "b": num2}
+        label = f"{num1} {operator} {num2}"
+    else:
+        expression = st.text_input(
+            "Enter expression:",
+            value="sqrt(a**2 + b**2)",
+            help="Operators: + - * / // % **  ·  Functions: " + ", ".join(FUNCTIONS) + "  ·  Constants: pi, e",
+        )
+        values = {}
+        try:
+            compiled = compile_expression(expression)
+            for name in compiled.variables:
+                values[name] = st.number_input(f"Value of {name}:", step=0.1, format="%.2f", key=f"var_{name}")
+        except ExpressionError as e:
+            st.warning(f"⚠️ {e}")
+        label = expression
+
     if st.button("Calculate"):
-        result = None
-        if operator == "+":
-            result = num1 + num2
-        elif operator == "-":
-            result = num1 - num2
-        elif operator == "*":
-            result = num1 * num2
-        elif operator == "/":
-            if num2 != 0:
-                result = num1 / num2
-            else:
-                st.error("Division by zero is not allowed!")
-        
-        if result is not None:
-            output = f"{num1} {operator} {num2} = {result}"
+        try:
+            result = evaluate(expression, **values)
+            output = f"{label} = {result}"
             st.success(f"✅ Result: {result}")
             st.session_state.history.append(output)
+        except ExpressionError as e:
+            st.error(str(e))
 
 # --- Age Calculator ---
 elif option == "Age Calculator":
@@ -94,11 +129,17 @@ elif option == "Unit Converter":
 # --- History Viewer ---
 elif option == "Calculation History":
     st.subheader("📜 History Log")
-    if not st.session_state.history:
+    history = st.session_state.history
+    if not history:
         st.info("No calculations yet!")
     else:
-        for i, item in enumerate(st.session_state.history[::-1], 1):
-            st.write(f"{i}. {item}")
+        page_size = st.selectbox("Entries per page", [10, 20, 50, 100], index=1)
+        pages = history.page_count(page_size)
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+        start = (page - 1) * page_size
+        for i, item in enumerate(history.page(page - 1, page_size), start + 1):
+            st.write(f"{i}. {item['text']}")
+        st.caption(f"{len(history)} calculations in total")
 
 # --- Percentage Calculator ---
 elif option == "Percentage Calculator":
@@ -122,3 +163,54 @@ elif option == "Date Difference Calculator":
         diff = abs((date2 - date1).days)
         st.success(f"📅 Difference between the two dates is: {diff} days")
         st.session_state.history.append(f"Date difference between {date1} and {date2} = {diff} days")
+
+# --- Bulk Mode ---
+elif option == "Bulk Mode (CSV)":
+    import pandas as pd
+    from calc_bulk import REQUIRED_COLUMNS, CONVERSIONS, OPERATORS, check_columns, run_bulk
+
+    st.subheader("📦 Bulk Mode")
+    st.caption("Upload a CSV and run one tool over every row at once.")
+
+    tool = st.selectbox("Choose tool:", list(REQUIRED_COLUMNS))
+    if REQUIRED_COLUMNS[tool]:
+        st.caption(f"Required columns: {', '.join(REQUIRED_COLUMNS[tool])}")
+
+    operator = converter = expression = None
+    if tool == "Basic Calculator":
+        operator = st.selectbox("Operator (used when the CSV has no 'operator' column):", list(OPERATORS))
+    elif tool == "Unit Converter":
+        converter = st.selectbox("Choose conversion type:", list(CONVERSIONS))
+    elif tool == "Expression":
+        expression = st.text_input("Expression (column names are variables):", value="a * b")
+
+    uploaded = st.file_uploader("Upload CSV", type=["csv"])
+
+    if uploaded is not None and st.button("Run Bulk"):
+        try:
+            df = pd.read_csv(uploaded)
+        except (ValueError, UnicodeDecodeError) as e:  # pandas parser errors are ValueErrors
+            st.error(f"Could not read the CSV: {e}")
+            st.stop()
+        missing = check_columns(df, tool)
+        if missing:
+            st.error(f"Missing columns: {', '.join(missing)}")
+        else:
+            try:
+                result_df = run_bulk(df, tool, operator=operator, converter=converter, expression=expression)
+            except ExpressionError as e:
+                st.error(str(e))
+                st.stop()
+            st.success(f"✅ Processed {len(result_df)} rows")
+            if "error" in result_df.columns:
+                errors = int((result_df["error"] != "").sum())
+                if errors:
+                    st.warning(f"{errors} rows could not be calculated (see 'error' column)")
+            st.dataframe(result_df.head(100))
+            st.download_button(
+                "Download results",
+                result_df.to_csv(index=False).encode("utf-8"),
+                "bulk_results.csv",
+                "text/csv",
+            )
+            st.session_state.history.append(f"Bulk {tool} over {len(result_df)} rows")
@@ -2,35 +2,25 @@
 
 import streamlit as st
 from dotenv import load_dotenv
-import os
-import tempfile
-import json
 
-# LangChain modules
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import PromptTemplate
-from langchain_core.documents import Document
-from langchain_community.document_loaders import (
-    TextLoader, CSVLoader, PyPDFLoader, UnstructuredWordDocumentLoader,
-    UnstructuredMarkdownLoader
-)
+from ingestion import DOCUMENT_TYPES, ingest_uploads
+from pipeline import gemini_model, summary_chain
+from metrics import diagnostics_panel, llm_config, timed
+
+APP = "app"
 
 # Load environment variables (e.g., API keys)
 load_dotenv()
 
-# Initialize model and parser
-model = ChatGoogleGenerativeAI(model="gemini-1.5-pro")
-parser = StrOutputParser()
-
 # Streamlit page config
 st.set_page_config(page_title="📄 AI File Summarizer", layout="centered")
 st.title("📄 AI File Summarizer with Gemini")
 
 # File upload
-uploaded_file = st.file_uploader(
-    "📂 Upload a file (txt, csv, md, json, pdf, docx)",
-    type=["txt", "csv", "md", "json", "pdf", "docx"]
+uploaded_files = st.file_uploader(
+    "📂 Upload files (txt, csv, md, json, pdf, docx)",
+    type=[ext.lstrip(".") for ext in DOCUMENT_TYPES],
+    accept_multiple_files=True
 )
 
 # Prompt input
@@ -40,52 +30,42 @@ custom_prompt = st.text_area(
     height=100
 )
 
-# Function to load and parse file content
-def load_file(path, extension):
-    try:
-        if extension == ".txt":
-            return TextLoader(path, encoding="utf-8").load()
-        elif extension == ".csv":
-            return CSVLoader(path).load()
-        elif extension == ".pdf":
-            return PyPDFLoader(path).load()
-        elif extension == ".docx":
-            return UnstructuredWordDocumentLoader(path).load()
-        elif extension == ".md":
-            return UnstructuredMarkdownLoader(path).load()
-        elif extension == ".json":
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                content = json.dumps(data, indent=2)
-                return [Document(page_content=content)]
-        else:
-            return None
-    except Exception as e:
-        st.error(f"❌ Error loading file: {e}")
-        return None
+# Load every upload in parallel, showing each file as soon as it's parsed
+if uploaded_files:
+    loaded = {}
+    progress = st.progress(0.0, text="📥 Reading files...")
+    with timed("parse_files", APP):
+        for i, result in enumerate(ingest_uploads(uploaded_files), 1):
+            if result.error:
+                st.error(f"❌ Error loading {result.name}: {result.error}")
+            else:
+                loaded[result.index] = result.documents
+            progress.progress(i / len(uploaded_files), text=f"📥 Read {result.name}")
+    progress.empty()
 
-# Main logic
-if uploaded_file is not None:
-    suffix = os.path.splitext(uploaded_file.name)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-        tmp_file.write(uploaded_file.read())
-        tmp_file_path = tmp_file.name
-
-    docs = load_file(tmp_file_path, suffix.lower())
+    # Keep the upload order, whatever order the workers finished in
+    docs = [doc for i in range(len(uploaded_files)) for doc in loaded.get(i, [])]
 
     if docs:
         content = "\n".join([doc.page_content for doc in docs])
 
-        with st.expander("📖 Show file content"):
-            st.text(content)
-
-        prompt = PromptTemplate(template=custom_prompt, input_variables=["poem"])
-        chain = prompt | model | parser
+        with timed("render", APP):
+            with st.expander("📖 Show file content"):
+                st.text(content)
 
         if st.button("✨ Generate Output"):
             with st.spinner("Generating..."):
-                response = chain.invoke({"poem": content})
-                st.success("✅ Summary Generated:")
-                st.markdown(f"### 🧠 Output\n{response}")
+                # The model (and LangChain) is only loaded once it's needed
+                chain = summary_chain(gemini_model("gemini-1.5-pro"), custom_prompt)
+                st.markdown("### 🧠 Output")
+                # Streamed so time-to-first-token can be measured
+                with timed("generate", APP):
+                    st.write_stream(chain.stream(
+                        {"poem": content},
+                        config=llm_config(APP)
+                    ))
+                st.success("✅ Summary Generated")
     else:
         st.error("❌ Failed to read the file. Try another format or fix content.")
+
+diagnostics_panel(APP)
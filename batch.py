@@ -0,0 +1,280 @@
+# batch.py
+# Headless batch runner: apply the app.py/text.py summary chain or the quiz.py
+# question prompt to every document in a directory, without Streamlit.
+# Files go through a work queue to a pool of worker threads. Each result is
+# appended to a JSONL output file, and its key to a checkpoint file, as soon
+# as it finishes, so an interrupted run picks up where it stopped when it is
+# started again with the same arguments.
+#
+#   python batch.py summary docs/ --out summaries.jsonl --workers 8
+#   python batch.py quiz docs/ --num 10 --out quiz.jsonl
+#   python batch.py summary docs/ --fake --latency 0.2    # offline, no API key
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+from ingestion import DOCUMENT_TYPES, list_files, load_path
+from metrics import REGISTRY, llm_config, timed
+from pipeline import SUMMARY_TEMPLATE, gemini_model, parse_questions, quiz_prompt, summary_chain
+
+APP = "batch"
+
+_DONE = object()  # sentinel put on the queue once per worker
+
+
+# --- Tasks ---
+def run_summary(model, content, template=SUMMARY_TEMPLATE, **_):
+    chain = summary_chain(model, template)
+    return {"summary": chain.invoke({"poem": content}, config=llm_config(APP))}
+
+
+def run_quiz(model, content, num=5, **_):
+    response = model.invoke(quiz_prompt(content, num), config=llm_config(APP))
+    questions = parse_questions(response)
+    if not questions:
+        raise ValueError("No questions generated")
+    return {"questions": questions}
+
+
+TASKS = {"summary": run_summary, "quiz": run_quiz}
+
+
+# --- Checkpoint ---
+def job_key(path, task, options):
+    """Identifies one file + task + settings. A file edited since the last
+    run gets a new key, so it is processed again."""
+    stat = os.stat(path)
+    raw = json.dumps([task, options, os.path.abspath(path), stat.st_size, stat.st_mtime_ns],
+                     sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def load_checkpoint(path):
+    """Keys of jobs that already succeeded. Failed jobs are tried again."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # line cut short by a crash
+            if entry.get("ok"):
+                done.add(entry["key"])
+    return done
+
+
+class ResultWriter:
+    """Appends output records and checkpoint entries, one line each.
+
+    The output line is flushed before the checkpoint line, so a crash can at
+    worst repeat one file on resume, never lose one.
+    """
+
+    def __init__(self, out_path, checkpoint_path):
+        self._out = open(out_path, "a", encoding="utf-8")
+        self._checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+
+    def write(self, key, record):
+        self._out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._out.flush()
+        self._checkpoint.write(json.dumps({"key": key, "file": record["file"], "ok": record["ok"]}) + "\n")
+        self._checkpoint.flush()
+
+    def close(self):
+        self._out.close()
+        self._checkpoint.close()
+
+
+# --- Workers ---
+def process_file(path, root, task, model, options, retries=2, backoff=1.0):
+    """Load one file and run the task on it. Never raises: errors end up in
+    the record."""
+    start = time.perf_counter()
+    record = {"file": os.path.relpath(path, root), "task": task, "ok": False, "attempts": 0}
+    with timed("parse_files", APP):
+        result = load_path(path)
+    content = "\n".join(doc.page_content for doc in result.documents)
+    if result.error:
+        record["error"] = result.error
+    elif not content.strip():
+        record["error"] = "No readable text found in the file"
+    else:
+        for attempt in range(1, retries + 2):
+            record["attempts"] = attempt
+            try:
+                with timed("model", APP):
+                    record.update(TASKS[task](model, content, **options))
+                record["ok"] = True
+                record.pop("error", None)
+                break
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                if attempt <= retries:
+                    time.sleep(backoff * 2 ** (attempt - 1))
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def _worker(jobs, results, stop, *args, **kwargs):
+    while True:
+        job = jobs.get()
+        if job is _DONE or stop.is_set():
+            results.put(_DONE)
+            return
+        key, path = job
+        results.put((key, process_file(path, *args, **kwargs)))
+
+
+def _feed(jobs, pending, workers, stop):
+    for job in pending:
+        if stop.is_set():
+            break
+        jobs.put(job)
+    for _ in range(workers):
+        jobs.put(_DONE)
+
+
+def run_batch(input_dir, task, model, out_path, checkpoint_path=None, workers=4,
+              options=None, retries=2, backoff=1.0, extensions=DOCUMENT_TYPES, progress=print):
+    """Process every file under input_dir that the checkpoint hasn't seen
+    succeed. Returns the report dict."""
+    options = options or {}
+    checkpoint_path = checkpoint_path or out_path + ".checkpoint"
+    done = load_checkpoint(checkpoint_path)
+
+    paths = list_files(input_dir, extensions)
+    pending = []
+    for path in paths:
+        key = job_key(path, task, options)
+        if key not in done:
+            pending.append((key, path))
+
+    report = {"task": task, "files": len(paths), "skipped": len(paths) - len(pending),
+              "processed": 0, "ok": 0, "failed": 0, "failures": [], "latencies": [],
+              "interrupted": False}
+    # Bounded so a huge directory isn't queued up front
+    jobs = queue.Queue(maxsize=workers * 4)
+    results = queue.Queue()
+    stop = threading.Event()
+    threads = [threading.Thread(target=_worker, daemon=True,
+                                args=(jobs, results, stop, input_dir, task, model, options, retries, backoff))
+               for _ in range(workers)]
+    feeder = threading.Thread(target=_feed, args=(jobs, pending, workers, stop), daemon=True)
+
+    writer = ResultWriter(out_path, checkpoint_path)
+
+    def collect(key, record):
+        writer.write(key, record)
+        report["processed"] += 1
+        report["latencies"].append(record["seconds"])
+        if record["ok"]:
+            report["ok"] += 1
+        else:
+            report["failed"] += 1
+            report["failures"].append({"file": record["file"], "error": record["error"]})
+        REGISTRY.inc("batch_files_total", help_text="Files processed by the batch runner",
+                     task=task, status="ok" if record["ok"] else "failed")
+        if progress:
+            progress(f"[{report['processed']}/{len(pending)}] {'ok    ' if record['ok'] else 'FAILED'} "
+                     f"{record['file']} ({record['seconds']:.2f}s)")
+
+    start = time.perf_counter()
+    try:
+        feeder.start()
+        for thread in threads:
+            thread.start()
+        finished = 0
+        while finished < workers:
+            item = results.get()
+            if item is _DONE:
+                finished += 1
+            else:
+                collect(*item)
+    except KeyboardInterrupt:
+        # Let the workers finish the files they hold; unstarted ones stay pending
+        stop.set()
+        report["interrupted"] = True
+        while any(thread.is_alive() for thread in threads) or not results.empty():
+            try:
+                item = results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not _DONE:
+                collect(*item)
+    finally:
+        writer.close()
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+# --- Reporting ---
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def print_report(report):
+    seconds = report["seconds"]
+    latencies = report["latencies"]
+    print(f"\n{report['task']}: {report['files']} files, {report['skipped']} already done, "
+          f"{report['processed']} processed in {seconds:.1f}s")
+    print(f"  ok {report['ok']}   failed {report['failed']}   "
+          f"throughput {report['processed'] / seconds if seconds else 0:.2f} files/s")
+    if latencies:
+        print(f"  per file  p50 {_percentile(latencies, 0.5):.2f}s   p90 {_percentile(latencies, 0.9):.2f}s   "
+              f"max {max(latencies):.2f}s")
+    tokens = {name: metric.value for (name, labels), metric in REGISTRY.items()
+              if name.endswith("_tokens_total") and dict(labels).get("app") == APP}
+    if tokens:
+        print("  tokens    " + "   ".join(f"{name[4:-13]} {value}" for name, value in tokens.items()))
+    for failure in report["failures"][:20]:
+        print(f"  FAILED {failure['file']}: {failure['error']}")
+    if len(report["failures"]) > 20:
+        print(f"  ... and {len(report['failures']) - 20} more (see the output file)")
+    if report["interrupted"]:
+        print("Interrupted. Run the same command again to resume.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise documents or generate quiz questions in bulk")
+    parser.add_argument("task", choices=sorted(TASKS))
+    parser.add_argument("input_dir")
+    parser.add_argument("--out", help="results JSONL (default: <task>_results.jsonl)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <out>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--num", type=int, default=5, help="questions per file (quiz)")
+    parser.add_argument("--template", default=SUMMARY_TEMPLATE, help="summary prompt, must contain {poem}")
+    parser.add_argument("--model", default="gemini-1.5-pro")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--fake", action="store_true", help="use the offline FakeChatModel")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake model latency (s)")
+    parser.add_argument("--quiet", action="store_true", help="no per-file progress lines")
+    parser.add_argument("--metrics", help="append the run's metrics as JSONL here")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fake_llm import FakeChatModel
+        llm = FakeChatModel(latency=args.latency)
+    else:
+        from dotenv import load_dotenv
+        load_dotenv()
+        if not os.getenv("GOOGLE_API_KEY"):
+            parser.error("GOOGLE_API_KEY not set (add it to .env, or use --fake)")
+        llm = gemini_model(args.model, priority="batch", temperature=0.3)
+
+    options = {"num": args.num} if args.task == "quiz" else {"template": args.template}
+    out = args.out or f"{args.task}_results.jsonl"
+    result = run_batch(args.input_dir, args.task, llm, out, args.checkpoint, args.workers, options,
+                       args.retries, progress=None if args.quiet else print)
+    print_report(result)
+    if args.metrics:
+        REGISTRY.write_jsonl(args.metrics)
@@ -0,0 +1,171 @@
+# bench_imports.py
+# Cold-start benchmark for the Streamlit apps.
+# Each app runs once in a fresh interpreter under `python -X importtime`, in
+# Streamlit's bare mode (no server), with nothing uploaded and no buttons
+# pressed, which is what a user sees when the page first opens. Reported:
+#   cold_start  - process start until the script finishes its first run
+#   first_paint - process start until the first element is drawn
+#   imports     - total import time and the slowest top-level packages
+#
+#   python bench_imports.py --out imports_after.json
+#   git worktree add /tmp/before <commit> && python bench_imports.py --root /tmp/before --out imports_before.json
+#   python bench_imports.py --compare imports_before.json imports_after.json
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+APPS = ["app.py", "text.py", "quiz.py", "prompt_ui.py", "dataan.py", "pak.py", "Calculator.py"]
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+# --- Child process: run one app ---
+def run_child(root, app):
+    """Run the app script once in bare mode and print timings as JSON."""
+    sys.path.insert(0, root)
+    os.chdir(root)
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+    import logging
+    logging.disable(logging.WARNING)  # bare mode warns on every element
+
+    import runpy
+    import streamlit  # noqa: F401  (every app imports it first anyway)
+    from streamlit.delta_generator import DeltaGenerator
+
+    first_paint = []
+    enqueue = DeltaGenerator._enqueue
+
+    def record_first_paint(self, *args, **kwargs):
+        if not first_paint:
+            first_paint.append(time.time())
+        return enqueue(self, *args, **kwargs)
+
+    DeltaGenerator._enqueue = record_first_paint
+
+    error = None
+    try:
+        runpy.run_path(os.path.join(root, app), run_name="__main__")
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    done = time.time()
+    print(json.dumps({"first_paint": first_paint[0] if first_paint else None,
+                      "done": done, "error": error}))
+
+
+# --- Parent: spawn and parse ---
+def parse_importtime(stderr, top=10):
+    """Total import time and the most expensive top-level packages."""
+    roots = {}
+    total = 0
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        if len(indent) == 1:  # imported directly, not by another module
+            package = name.split(".")[0]
+            roots[package] = roots.get(package, 0) + int(cumulative)
+            total += int(cumulative)
+    slowest = sorted(roots.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {"total_ms": total / 1000,
+            "top_packages_ms": {name: us / 1000 for name, us in slowest}}
+
+
+def measure_app(root, app, runs=3):
+    samples = []
+    for _ in range(runs):
+        start = time.time()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", app, "--root", root],
+            capture_output=True, text=True,
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if not lines:
+            raise RuntimeError(f"{app} crashed:\n{proc.stderr[-2000:]}")
+        child = json.loads(lines[-1])
+        samples.append({
+            "cold_start_ms": (child["done"] - start) * 1000,
+            "first_paint_ms": (child["first_paint"] - start) * 1000 if child["first_paint"] else None,
+            "error": child["error"],
+            "imports": parse_importtime(proc.stderr),
+        })
+
+    # Report the fastest run: the least disturbed by the rest of the machine
+    best = min(samples, key=lambda s: s["cold_start_ms"])
+    return best
+
+
+def run_all(root, apps, runs):
+    return {
+        "meta": {"root": root, "commit": _commit(root), "python": sys.version.split()[0], "runs": runs},
+        "apps": {app: measure_app(root, app, runs) for app in apps},
+    }
+
+
+def _commit(root):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+# --- Reporting ---
+def print_report(results):
+    for app, r in results["apps"].items():
+        paint = f"{r['first_paint_ms']:8.0f} ms" if r["first_paint_ms"] else "     n/a"
+        print(f"\n{app:<14} cold start {r['cold_start_ms']:8.0f} ms   first paint {paint}   "
+              f"imports {r['imports']['total_ms']:8.0f} ms")
+        if r["error"]:
+            print(f"  error: {r['error']}")
+        for name, ms in r["imports"]["top_packages_ms"].items():
+            print(f"    {name:<28} {ms:8.1f} ms")
+
+
+def compare(before, after):
+    print(f"before {before['meta']['commit']}  ->  after {after['meta']['commit']}")
+    print(f"{'app':<14} {'cold start (ms)':>24} {'first paint (ms)':>24} {'imports (ms)':>24}")
+    for app, new in after["apps"].items():
+        old = before["apps"].get(app)
+        if not old:
+            continue
+        cells = []
+        for old_v, new_v in [(old["cold_start_ms"], new["cold_start_ms"]),
+                             (old["first_paint_ms"], new["first_paint_ms"]),
+                             (old["imports"]["total_ms"], new["imports"]["total_ms"])]:
+            if old_v is None or new_v is None:
+                cells.append(f"{'n/a':>24}")
+            else:
+                cells.append(f"{old_v:8.0f} -> {new_v:6.0f} ({(new_v - old_v) / old_v * 100:+4.0f}%)")
+        print(f"{app:<14} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start / import-time benchmark for the apps")
+    parser.add_argument("--root", default=HERE, help="tree containing the apps (default: this one)")
+    parser.add_argument("--apps", nargs="*", default=APPS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(os.path.abspath(args.root), args.child)
+    elif args.compare:
+        with open(args.compare[0]) as f1, open(args.compare[1]) as f2:
+            compare(json.load(f1), json.load(f2))
+    else:
+        results = run_all(os.path.abspath(args.root), args.apps, args.runs)
+        print_report(results)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nSaved to {args.out}")
@@ -0,0 +1,355 @@
+# benchmark.py
+# Offline benchmark for the load -> split -> prompt -> model -> parse paths of
+# app.py, text.py, quiz.py and prompt_ui.py.
+# Inputs are generated (PDF, DOCX, large CSV) and Gemini is replaced by the
+# deterministic FakeChatModel, so results only move when our code does.
+#
+#   python benchmark.py --runs 20 --latency 0.05 --out bench.json
+#   python benchmark.py --compare bench_before.json bench_after.json
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from fake_llm import FakeChatModel
+from ingestion import load_path
+from pipeline import (
+    format_context, parse_questions, qa_chain, quiz_prompt, research_prompt,
+    split_docs, summary_chain
+)
+from retrieval import HashingEmbedder, VectorIndex
+
+SENTENCE = "Large language models summarise documents by reading chunks of text and condensing them."
+
+
+# --- Synthetic documents ---
+def _paragraphs(count):
+    return [f"Paragraph {i}. " + SENTENCE * 3 for i in range(count)]
+
+
+def make_pdf(path, pages=20, lines_per_page=40):
+    """Write a plain multi-page text PDF by hand (no PDF library needed)."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for p in range(pages):
+        text = [b"BT /F1 9 Tf 40 800 Td 11 TL"]
+        for line in range(lines_per_page):
+            words = f"Page {p + 1} line {line + 1}: {SENTENCE}"
+            words = words.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            text.append(f"({words}) '".encode("latin-1"))
+        text.append(b"ET")
+        stream = b"\n".join(text)
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_obj, font, content)))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def make_docx(path, paragraphs=300):
+    """Write a minimal .docx (a zip of WordprocessingML parts)."""
+    body = "".join(f"<w:p><w:r><w:t>{escape(p)}</w:t></w:r></w:p>" for p in _paragraphs(paragraphs))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/word/document.xml" '
+                   'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+                   '</Types>')
+        z.writestr("_rels/.rels",
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" '
+                   'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+                   'Target="word/document.xml"/></Relationships>')
+        z.writestr("word/document.xml",
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                   f'<w:body>{body}</w:body></w:document>')
+    return path
+
+
+def make_csv(path, rows=20000):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,category,amount,description\n")
+        for i in range(rows):
+            f.write(f"{i},cat{i % 17},{(i * 37) % 1000 / 10:.1f},\"{SENTENCE}\"\n")
+    return path
+
+
+def make_txt(path, paragraphs=400):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(_paragraphs(paragraphs)))
+    return path
+
+
+def make_inputs(directory, csv_rows=20000, pdf_pages=20):
+    return {
+        "pdf": make_pdf(os.path.join(directory, "sample.pdf"), pages=pdf_pages),
+        "docx": make_docx(os.path.join(directory, "sample.docx")),
+        "csv": make_csv(os.path.join(directory, "sample.csv"), rows=csv_rows),
+        "txt": make_txt(os.path.join(directory, "sample.txt")),
+    }
+
+
+# --- Pipelines (mirroring each app's main path) ---
+def _load(path, timings):
+    start = time.perf_counter()
+    result = load_path(path)
+    timings["load"] = time.perf_counter() - start
+    if result.error:
+        raise RuntimeError(f"{path}: {result.error}")
+    return result.documents
+
+
+def _run_steps(chain, value, names, timings):
+    """Invoke a RunnableSequence one step at a time, timing each step."""
+    for name, step in zip(names, chain.steps):
+        start = time.perf_counter()
+        value = step.invoke(value)
+        timings[name] = time.perf_counter() - start
+    return value
+
+
+def run_app(path, model, **_):
+    timings = {}
+    docs = _load(path, timings)
+    content = "\n".join(doc.page_content for doc in docs)
+    _run_steps(summary_chain(model), {"poem": content}, ["prompt", "model", "parse"], timings)
+    return timings
+
+
+def run_text(path, model, strategy="Text Structure-Based", chunk_size=1000, chunk_overlap=100, **_):
+    timings = {}
+    docs = _load(path, timings)
+    start = time.perf_counter()
+    chunks = split_docs(docs, strategy, chunk_size, chunk_overlap)
+    timings["split"] = time.perf_counter() - start
+    _run_steps(summary_chain(model), {"poem": chunks[0].page_content},
+               ["prompt", "model", "parse"], timings)
+    return timings
+
+
+def run_text_qa(path, model, chunk_size=1000, chunk_overlap=100, k=4, **_):
+    timings = {}
+    docs = _load(path, timings)
+    start = time.perf_counter()
+    chunks = split_docs(docs, "Text Structure-Based", chunk_size, chunk_overlap)
+    timings["split"] = time.perf_counter() - start
+    start = time.perf_counter()
+    embedder = HashingEmbedder()
+    hits = VectorIndex.build(chunks, embedder).query(["What does line 12 of page 3 say?"], embedder, k=k)[0]
+    timings["retrieve"] = time.perf_counter() - start
+    _run_steps(qa_chain(model), {"context": format_context(hits), "question": "What does line 12 of page 3 say?"},
+               ["prompt", "model", "parse"], timings)
+    return timings
+
+
+def run_quiz(path, model, num=5, **_):
+    timings = {}
+    docs = _load(path, timings)
+    content = "\n".join(doc.page_content for doc in docs)
+    start = time.perf_counter()
+    prompt = quiz_prompt(content, num)
+    timings["prompt"] = time.perf_counter() - start
+    start = time.perf_counter()
+    response = model.invoke(prompt)
+    timings["model"] = time.perf_counter() - start
+    start = time.perf_counter()
+    questions = parse_questions(response)
+    timings["parse"] = time.perf_counter() - start
+    if len(questions) != num:
+        raise RuntimeError(f"expected {num} questions, got {len(questions)}")
+    return timings
+
+
+def run_prompt_ui(path, model, **_):
+    timings = {}
+    chain = research_prompt() | model
+    inputs = {"paper_input": "Attention Is All You Need",
+              "style_input": "Technical", "length_input": "Short (1-2 paragraphs)"}
+    result = _run_steps(chain, inputs, ["prompt", "model"], timings)
+    start = time.perf_counter()
+    result.content
+    timings["parse"] = time.perf_counter() - start
+    return timings
+
+
+# name -> (runner, input kind, options)
+SCENARIOS = {
+    "app.py[pdf]": (run_app, "pdf", {}),
+    "app.py[docx]": (run_app, "docx", {}),
+    "app.py[csv]": (run_app, "csv", {}),
+    "text.py[pdf,recursive]": (run_text, "pdf", {"strategy": "Text Structure-Based"}),
+    "text.py[txt,length]": (run_text, "txt", {"strategy": "Length-Based"}),
+    "text.py[pdf,qa]": (run_text_qa, "pdf", {}),
+    "quiz.py[pdf]": (run_quiz, "pdf", {}),
+    "quiz.py[docx]": (run_quiz, "docx", {}),
+    "prompt_ui.py": (run_prompt_ui, None, {}),
+}
+
+
+# --- Measurement ---
+def summarize(samples):
+    arr = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "mean_ms": float(arr.mean()),
+    }
+
+
+def measure(runner, path, model, runs, options):
+    runner(path, model, **options)  # warm-up (imports, caches)
+
+    stages = {}
+    totals = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        timings = runner(path, model, **options)
+        totals.append(time.perf_counter() - start)
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+
+    # Peak memory from one separate traced run, so tracing doesn't skew timings
+    tracemalloc.start()
+    runner(path, model, **options)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs": runs,
+        "throughput_per_sec": runs / sum(totals),
+        "peak_memory_mb": peak / 1024 / 1024,
+        "total": summarize(totals),
+        "stages": {stage: summarize(samples) for stage, samples in stages.items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_benchmarks(runs=10, latency=0.0, token_latency=0.0, csv_rows=20000,
+                   pdf_pages=20, only=None):
+    model = FakeChatModel(latency=latency, token_latency=token_latency)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": runs,
+            "latency": latency,
+            "token_latency": token_latency,
+            "csv_rows": csv_rows,
+            "pdf_pages": pdf_pages,
+        },
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="llm_bench_") as directory:
+        inputs = make_inputs(directory, csv_rows=csv_rows, pdf_pages=pdf_pages)
+        for name, (runner, kind, options) in SCENARIOS.items():
+            if only and not any(o in name for o in only):
+                continue
+            path = inputs[kind] if kind else None
+            results["scenarios"][name] = measure(runner, path, model, runs, options)
+    return results
+
+
+# --- Reporting ---
+def print_report(results):
+    for name, r in results["scenarios"].items():
+        print(f"\n{name}  ({r['throughput_per_sec']:.1f}/s, peak {r['peak_memory_mb']:.1f} MB)")
+        for stage, s in list(r["stages"].items()) + [("total", r["total"])]:
+            print(f"  {stage:<8} p50 {s['p50_ms']:9.2f} ms   p90 {s['p90_ms']:9.2f} ms   "
+                  f"p99 {s['p99_ms']:9.2f} ms")
+
+
+def compare(before, after):
+    """Print the p50 change of every stage between two result files."""
+    print(f"before {before['meta']['commit']}  ->  after {after['meta']['commit']}")
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None:
+            continue
+        print(f"\n{name}")
+        for stage, s in list(new["stages"].items()) + [("total", new["total"])]:
+            prev = old["total"] if stage == "total" else old["stages"].get(stage)
+            if not prev:
+                continue
+            change = (s["p50_ms"] - prev["p50_ms"]) / prev["p50_ms"] * 100 if prev["p50_ms"] else 0.0
+            print(f"  {stage:<8} {prev['p50_ms']:9.2f} -> {s['p50_ms']:9.2f} ms  ({change:+.1f}%)")
+        mem = new["peak_memory_mb"] - old["peak_memory_mb"]
+        print(f"  memory   {old['peak_memory_mb']:9.2f} -> {new['peak_memory_mb']:9.2f} MB  ({mem:+.2f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark for the LLM apps")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake model delay before first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake model delay per token (s)")
+    parser.add_argument("--csv-rows", type=int, default=20000)
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="run only scenarios containing these names")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare two saved result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f1, open(args.compare[1]) as f2:
+            compare(json.load(f1), json.load(f2))
+    else:
+        results = run_benchmarks(args.runs, args.latency, args.token_latency,
+                                 args.csv_rows, args.pdf_pages, args.only)
+        print_report(results)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nSaved to {args.out}")
@@ -0,0 +1,169 @@
+# calc_engine.py
+# Safe arithmetic expression engine for NeuroCalc.
+# Expressions are parsed once into a validated AST, compiled, and cached by
+# their text, so the same expression can be evaluated again on scalars or on
+# whole NumPy arrays without re-parsing.
+
+import ast
+from functools import lru_cache
+
+import numpy as np
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that are invalid, unsafe or can't be evaluated."""
+
+
+# --- Allowed building blocks ---
+BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+UNARY_OPS = (ast.UAdd, ast.USub)
+
+CONSTANTS = {
+    "pi": np.pi,
+    "e": np.e,
+}
+
+# NumPy ufuncs work on plain numbers and on arrays alike
+FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    # Literals are floats (see _validate), so the digits need casting back
+    "round": lambda v, digits=0: np.round(v, int(digits)),
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "min": np.minimum,
+    "max": np.maximum,
+    # Unit conversions (same factors as the Unit Converter)
+    "in_to_cm": lambda v: v * 2.54,
+    "cm_to_in": lambda v: v / 2.54,
+    "f_to_c": lambda v: (v - 32) * 5 / 9,
+    "c_to_f": lambda v: v * 9 / 5 + 32,
+    "kg_to_lb": lambda v: v * 2.20462,
+    "lb_to_kg": lambda v: v / 2.20462,
+    "pct": lambda base, percent: base * percent / 100,
+}
+
+MAX_LENGTH = 500
+
+
+# --- Compiled expression ---
+class CompiledExpression:
+    def __init__(self, source, code, variables):
+        self.source = source
+        self.code = code
+        self.variables = variables
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+    def _run(self, values):
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise ExpressionError(f"Missing value for: {', '.join(missing)}")
+
+        namespace = dict(CONSTANTS)
+        namespace.update(FUNCTIONS)
+        namespace.update(values)
+        try:
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                return eval(self.code, {"__builtins__": {}}, namespace)
+        except ZeroDivisionError:
+            raise ExpressionError("Division by zero is not allowed!")
+        except OverflowError:
+            raise ExpressionError("Result is too large")
+        except (TypeError, ValueError) as e:
+            raise ExpressionError(str(e))
+
+    def evaluate(self, **values):
+        """Evaluate for single numbers and return a float."""
+        result = self._run({k: float(v) for k, v in values.items()})
+        if isinstance(result, complex):
+            raise ExpressionError("Result is not a real number")
+        result = float(result)
+        if np.isinf(result):
+            raise ExpressionError("Result is not finite")
+        if np.isnan(result):
+            raise ExpressionError("Result is not a number")
+        return result
+
+    def evaluate_array(self, **values):
+        """Evaluate element-wise over NumPy arrays.
+
+        Rows that divide by zero or fall outside a function's domain come
+        back as NaN instead of raising.
+        """
+        arrays = {k: np.asarray(v, dtype=float) for k, v in values.items()}
+        size = max((a.size for a in arrays.values()), default=1)
+        result = np.asarray(self._run(arrays))
+        if np.iscomplexobj(result):
+            # Only constant expressions get here: float arrays give NaN, not complex
+            raise ExpressionError("Result is not a real number")
+        result = np.broadcast_to(result.astype(float), (size,)).copy()
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+
+# --- Parsing & validation ---
+def _validate(node, variables):
+    if isinstance(node, ast.Expression):
+        _validate(node.body, variables)
+    elif isinstance(node, ast.BinOp):
+        if not isinstance(node.op, BIN_OPS):
+            raise ExpressionError(f"Operator not allowed: {type(node.op).__name__}")
+        _validate(node.left, variables)
+        _validate(node.right, variables)
+    elif isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, UNARY_OPS):
+            raise ExpressionError(f"Operator not allowed: {type(node.op).__name__}")
+        _validate(node.operand, variables)
+    elif isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"Only numbers are allowed, got {node.value!r}")
+        # Floats overflow instead of building huge ints (e.g. 9**9**9)
+        node.value = float(node.value)
+    elif isinstance(node, ast.Name):
+        if node.id in FUNCTIONS:
+            raise ExpressionError(f"'{node.id}' is a function, call it like {node.id}(x)")
+        if node.id not in CONSTANTS:
+            variables.add(node.id)
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ExpressionError("Unknown function")
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not allowed")
+        for arg in node.args:
+            _validate(arg, variables)
+    else:
+        raise ExpressionError(f"Not allowed in an expression: {type(node).__name__}")
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text):
+    """Parse, validate and compile an expression. Results are LRU-cached by text."""
+    if len(text) > MAX_LENGTH:
+        raise ExpressionError(f"Expression is longer than {MAX_LENGTH} characters")
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}")
+
+    variables = set()
+    _validate(tree, variables)
+    code = compile(tree, "<expression>", "eval")
+    return CompiledExpression(text, code, tuple(sorted(variables)))
+
+
+def evaluate(text, /, **values):
+    """Compile (or fetch from cache) and evaluate an expression on numbers."""
+    return compile_expression(text).evaluate(**values)
+
+
+def cache_info():
+    """Hit/miss statistics of the compiled-expression cache."""
+    return compile_expression.cache_info()
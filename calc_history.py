@@ -0,0 +1,156 @@
+# calc_history.py
+# Calculation history for NeuroCalc.
+# Recent entries live in a bounded in-memory ring buffer; every entry is also
+# appended to a JSONL log (written in batches) so history survives restarts.
+# Older pages are read back from the log on demand using a byte-offset index.
+# Each user gets their own log file (see log_path). Open one store per file
+# per process: sessions of the same user share it, so their offsets agree.
+
+import atexit
+import datetime
+import json
+import os
+import re
+import threading
+import weakref
+from collections import deque
+from itertools import islice
+
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calc_history")
+
+USER_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def log_path(user_id, directory=HISTORY_DIR):
+    """Log file for one user. The id must be a uuid4 hex string, so a value
+    taken from the URL can't point outside the history directory."""
+    if not USER_ID.match(user_id):
+        raise ValueError(f"Invalid history id: {user_id!r}")
+    return os.path.join(directory, f"{user_id}.jsonl")
+
+
+# Weak, so stores nobody uses any more can be freed; the rest flush on exit
+_open_stores = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_stores():
+    for store in list(_open_stores):
+        store.flush()
+
+
+class HistoryStore:
+    def __init__(self, path, max_memory=1000, batch_size=20, flush_interval=5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._recent = deque(maxlen=max_memory)  # newest entries, in order
+        self._pending = []                       # written to memory, not yet to disk
+        self._offsets = []                       # byte offset of each line on disk
+        self._timer = None                       # flushes pending entries after flush_interval
+        self._lock = threading.Lock()
+        self._load()
+        _open_stores.add(self)
+
+    # --- Loading ---
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        line = b"\n"
+        with open(self.path, "rb") as f:
+            for line in f:
+                self._offsets.append(offset)
+                offset += len(line)
+        if not line.endswith(b"\n"):
+            # Last write was cut short: end the line so the next batch
+            # starts on a fresh one and the offsets stay right
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+        start = max(0, len(self._offsets) - self._recent.maxlen)
+        self._recent.extend(self._read_range(start, len(self._offsets)))
+
+    def _read_range(self, start, stop):
+        """Read entries start..stop-1 from the log file."""
+        entries = []
+        if start >= stop:
+            return entries
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[start])
+            for _ in range(stop - start):
+                line = f.readline()
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    entries.append({"ts": "", "text": line.decode("utf-8", "replace").strip()})
+        return entries
+
+    # --- Writing ---
+    def append(self, text):
+        entry = {"ts": datetime.datetime.now().isoformat(timespec="seconds"), "text": text}
+        with self._lock:
+            self._recent.append(entry)
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+            elif self._timer is None:
+                # Don't leave a short batch waiting for the next append
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        lines = [(json.dumps(e, ensure_ascii=False) + "\n").encode("utf-8") for e in self._pending]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(b"".join(lines))
+        for line in lines:
+            self._offsets.append(offset)
+            offset += len(line)
+        self._pending = []
+
+    # --- Reading ---
+    def __len__(self):
+        return len(self._offsets) + len(self._pending)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def page(self, number, size=20):
+        """Entries for page ``number`` (0-based), newest first."""
+        with self._lock:
+            total = len(self)
+            stop = total - number * size   # exclusive, in oldest-first order
+            start = max(0, stop - size)
+            if stop <= 0:
+                return []
+
+            in_memory_from = total - len(self._recent)
+            if start >= in_memory_from:
+                entries = list(islice(self._recent, start - in_memory_from, stop - in_memory_from))
+            else:
+                # Older than the ring buffer: everything needed is on disk
+                self._flush_locked()
+                entries = self._read_range(start, stop)
+        return entries[::-1]
+
+    def page_count(self, size=20):
+        return max(1, -(-len(self) // size))
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._pending = []
+            self._offsets = []
+            if os.path.exists(self.path):
+                os.remove(self.path)
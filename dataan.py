@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import io
 
+from ingestion import TABLE_TYPES, load_dataframe
+from lazy import lazy_import
+
+# Plotting backends are only imported when a chart is drawn
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+
 st.set_page_config(page_title="Pandas File Analyzer", layout="wide")
 st.title("📊 Universal Pandas File Analyzer & Visualizer")
 
@@ -79,28 +84,11 @@ pandas_commands = {
 }
 
 # --- File Upload ---
-file = st.file_uploader("Upload a data file", type=["csv", "tsv", "xlsx", "xls", "json", "html", "xml"])
-
-# --- Load Data ---
-def load_data(file):
-    if file.name.endswith(".csv"):
-        return pd.read_csv(file)
-    elif file.name.endswith(".tsv"):
-        return pd.read_csv(file, sep="\t")
-    elif file.name.endswith((".xlsx", ".xls")):
-        return pd.read_excel(file)
-    elif file.name.endswith(".json"):
-        return pd.read_json(file)
-    elif file.name.endswith(".html"):
-        return pd.read_html(file)[0]
-    elif file.name.endswith(".xml"):
-        return pd.read_xml(file)
-    else:
-        return None
+file = st.file_uploader("Upload a data file", type=[ext.lstrip(".") for ext in TABLE_TYPES])
 
 if file:
     try:
-        raw_df = load_data(file)
+        raw_df = load_dataframe(file)
         if raw_df is None:
             st.error("Unsupported file format.")
             st.stop()
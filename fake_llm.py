@@ -0,0 +1,136 @@
+# fake_llm.py
+# Deterministic stand-in for ChatGoogleGenerativeAI, used by the benchmarks
+# and the batch runner so the apps' chains can run offline, plus a variant
+# that enforces a quota and answers 429 like the real API (ratelimit.py).
+# The reply depends only on the prompt text, and latency is configurable:
+# `latency` seconds before the first token, then `token_latency` per token.
+
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+WORDS = (
+    "model data results method paper shows analysis important summary key "
+    "approach performance training text document section value table figure "
+    "important findings improves study describes introduces evaluates"
+).split()
+
+
+def count_tokens(text):
+    """Rough token count (words), good enough for a fake model."""
+    return len(text.split())
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0
+    token_latency: float = 0.0
+    output_tokens: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        words = [WORDS[(seed >> (i % 200)) % len(WORDS)] for i in range(self.output_tokens)]
+
+        # Quiz prompts ask for "exactly N ... questions" in "Q1." format
+        match = re.search(r"generate exactly (\d+)", prompt)
+        if match:
+            num = int(match.group(1))
+            return "\n".join(f"Q{i}. What does the {words[i % len(words)]} describe?"
+                             for i in range(1, num + 1))
+        return " ".join(words).capitalize() + "."
+
+    def _usage(self, messages, text):
+        input_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        output_tokens = count_tokens(text)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(self.latency + self.token_latency * count_tokens(text))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text = self._reply(messages)
+        time.sleep(self.latency)
+        tokens = text.split(" ")
+        for i, token in enumerate(tokens):
+            time.sleep(self.token_latency)
+            piece = token if i == 0 else " " + token
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=self._usage(messages, text)))
+
+
+# --- Provider quota stub ---
+class RateLimitError(Exception):
+    """Raised by QuotaFakeChatModel; looks like a 429 from the provider."""
+    code = 429
+
+
+class QuotaFakeChatModel(FakeChatModel):
+    """FakeChatModel behind a provider-style quota: a call beyond
+    max_concurrency at once, or beyond requests_per_second, gets a 429."""
+
+    max_concurrency: int = 4
+    requests_per_second: float = 10.0
+    _state: dict = PrivateAttr(default_factory=lambda: {
+        "lock": threading.Lock(), "active": 0, "starts": deque(), "served": 0, "throttled": 0})
+
+    @contextmanager
+    def _quota(self):
+        state = self._state
+        now = time.monotonic()
+        with state["lock"]:
+            starts = state["starts"]
+            while starts and now - starts[0] > 1.0:
+                starts.popleft()
+            if state["active"] >= self.max_concurrency or len(starts) >= self.requests_per_second:
+                state["throttled"] += 1
+                raise RateLimitError("429 Resource has been exhausted (e.g. check quota).")
+            state["active"] += 1
+            starts.append(now)
+        try:
+            yield
+        finally:
+            with state["lock"]:
+                state["active"] -= 1
+                state["served"] += 1
+
+    def stats(self):
+        return {"served": self._state["served"], "throttled": self._state["throttled"]}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._quota():
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._quota():
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
@@ -0,0 +1,217 @@
+# ingestion.py
+# Shared file loading for app.py, text.py, quiz.py and dataan.py.
+# The real format is sniffed from the file's magic bytes (via `filetype`),
+# falling back to the extension for plain-text formats, and many uploads can
+# be parsed at once on a worker pool with results streamed back as each
+# file finishes.
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import filetype
+
+from lazy import lazy_import
+
+# Each loader is imported only when a file of its type shows up
+text_loader = lazy_import("langchain_community.document_loaders.text")
+csv_loader = lazy_import("langchain_community.document_loaders.csv_loader")
+pdf_loader = lazy_import("langchain_community.document_loaders.pdf")
+docx_loader = lazy_import("langchain_community.document_loaders.word_document")
+lc_documents = lazy_import("langchain_core.documents")
+pd = lazy_import("pandas")
+
+DOCUMENT_TYPES = [".txt", ".csv", ".pdf", ".docx", ".md", ".json"]
+TABLE_TYPES = [".csv", ".tsv", ".xlsx", ".xls", ".json", ".html", ".xml"]
+
+# Binary formats recognised from magic bytes
+MAGIC_TYPES = {
+    "pdf": ".pdf",
+    "docx": ".docx",
+    "xlsx": ".xlsx",
+    "xls": ".xls",
+}
+# Old Office files share one OLE header, so filetype can't tell them apart
+OLE_TYPES = {".doc", ".xls", ".ppt"}
+
+HEADER_SIZE = 8192  # bytes filetype reads to identify a format (zip-based Office files need more than the header)
+
+# index: position in the list passed to ingest_uploads/ingest_paths (names can repeat)
+IngestResult = namedtuple("IngestResult", ["name", "extension", "documents", "error", "seconds", "index"],
+                          defaults=[None])
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+# --- Format detection ---
+def sniff_extension(head, name):
+    """Work out the real extension from the first bytes of a file.
+
+    Text formats (txt, csv, md, json, ...) have no magic number, so for those
+    the extension in the file name is used. Only a supported binary format
+    overrides the name: short signatures like "BM" or "ID3" also start
+    ordinary text (a CSV with a "BMI" column would otherwise become a .bmp).
+    """
+    declared = os.path.splitext(name)[1].lower()
+    kind = filetype.guess(head)
+    if kind is None:
+        return declared
+    extension = "." + kind.extension
+    if extension in OLE_TYPES:
+        return declared if declared in OLE_TYPES else extension
+    return MAGIC_TYPES.get(kind.extension, declared)
+
+
+# --- Loaders ---
+def load_documents(path, extension):
+    """Parse one file on disk into LangChain Documents."""
+    if extension == ".txt":
+        return text_loader.TextLoader(path, encoding="utf-8").load()
+    elif extension == ".csv":
+        return csv_loader.CSVLoader(path).load()
+    elif extension == ".pdf":
+        return pdf_loader.PyPDFLoader(path).load()
+    elif extension == ".docx":
+        return docx_loader.Docx2txtLoader(path).load()
+    elif extension == ".md":
+        # Kept as plain text: the "Document Structure-Based" splitter reads
+        # the # headers, and UnstructuredMarkdownLoader needs unpinned `unstructured`
+        return text_loader.TextLoader(path, encoding="utf-8").load()
+    elif extension == ".json":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            return [lc_documents.Document(page_content=json.dumps(data, indent=2))]
+    else:
+        raise UnsupportedFormat(f"Unsupported file format: {extension or 'unknown'}")
+
+
+def load_bytes(name, data):
+    """Sniff and parse an in-memory file. Runs inside the worker pool."""
+    start = time.perf_counter()
+    extension = sniff_extension(data[:HEADER_SIZE], name)
+    documents, error = [], None
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as tmp_file:
+            tmp_file.write(data)
+            tmp_path = tmp_file.name
+        documents = load_documents(tmp_path, extension)
+        for doc in documents:
+            doc.metadata["source"] = name
+    except Exception as e:
+        error = str(e)
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+    return IngestResult(name, extension, documents, error, time.perf_counter() - start)
+
+
+def load_path(path):
+    with open(path, "rb") as f:
+        return load_bytes(os.path.basename(path), f.read())
+
+
+# --- Parallel ingestion ---
+def _executor(max_workers, processes):
+    if processes:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def ingest_uploads(uploaded_files, max_workers=None, processes=False):
+    """Parse Streamlit uploads concurrently, yielding an IngestResult per file
+    in the order they finish."""
+    with _executor(max_workers, processes) as pool:
+        futures = {pool.submit(load_bytes, f.name, f.getvalue()): i for i, f in enumerate(uploaded_files)}
+        for future in as_completed(futures):
+            yield future.result()._replace(index=futures[future])
+
+
+def ingest_paths(paths, max_workers=None, processes=False):
+    """Same as ingest_uploads, for files on disk."""
+    with _executor(max_workers, processes) as pool:
+        futures = {pool.submit(load_path, path): i for i, path in enumerate(paths)}
+        for future in as_completed(futures):
+            yield future.result()._replace(index=futures[future])
+
+
+def list_files(directory, extensions=DOCUMENT_TYPES):
+    """All files under directory whose name ends with one of the extensions."""
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in extensions:
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+# --- Tables (dataan.py) ---
+def load_dataframe(file):
+    """Read an uploaded data file into a DataFrame, or None if unsupported."""
+    data = file.getvalue()
+    extension = sniff_extension(data[:HEADER_SIZE], file.name)
+    buffer = io.BytesIO(data)
+    if extension == ".csv":
+        return pd.read_csv(buffer)
+    elif extension == ".tsv":
+        return pd.read_csv(buffer, sep="\t")
+    elif extension in (".xlsx", ".xls"):
+        return pd.read_excel(buffer)
+    elif extension == ".json":
+        return pd.read_json(buffer)
+    elif extension == ".html":
+        return pd.read_html(buffer)[0]
+    elif extension == ".xml":
+        return pd.read_xml(buffer)
+    else:
+        return None
+
+
+# --- Benchmark ---
+def make_corpus(directory, files=200):
+    """Write a synthetic corpus of txt/csv/json files."""
+    os.makedirs(directory, exist_ok=True)
+    line = "The quick brown fox jumps over the lazy dog. " * 4
+    for i in range(files):
+        kind = (".txt", ".csv", ".json")[i % 3]
+        path = os.path.join(directory, f"doc_{i:05d}{kind}")
+        with open(path, "w", encoding="utf-8") as f:
+            if kind == ".txt":
+                f.write("\n".join(line for _ in range(200)))
+            elif kind == ".csv":
+                f.write("id,name,text\n")
+                f.writelines(f"{r},row {r},{line}\n" for r in range(200))
+            else:
+                json.dump({"id": i, "paragraphs": [line] * 200}, f)
+    return list_files(directory)
+
+
+def benchmark(paths, workers=(1, 4, 8), processes=False):
+    """Files per second for each worker count."""
+    report = {}
+    for n in workers:
+        start = time.perf_counter()
+        failed = sum(1 for r in ingest_paths(paths, max_workers=n, processes=processes) if r.error)
+        elapsed = time.perf_counter() - start
+        report[n] = {"files": len(paths), "failed": failed,
+                     "seconds": elapsed, "files_per_sec": len(paths) / elapsed}
+    return report
+
+
+if __name__ == "__main__":
+    # python ingestion.py [corpus_dir]  -- synthetic corpus when no dir given
+    if len(sys.argv) > 1:
+        corpus = list_files(sys.argv[1])
+    else:
+        corpus = make_corpus(tempfile.mkdtemp(prefix="ingest_bench_"))
+    for mode in (False, True):
+        for n, r in benchmark(corpus, processes=mode).items():
+            print(f"{'processes' if mode else 'threads':>9} x{n:<2}  {r['files']} files  "
+                  f"{r['failed']} failed  {r['seconds']:.2f}s  {r['files_per_sec']:.1f} files/s")
@@ -0,0 +1,57 @@
+# lazy.py
+# Deferred imports for the heavy pieces of the apps: document loaders, text
+# splitters, plotting, pandas and the Gemini client.
+# A lazy module only imports the real one the first time one of its
+# attributes is used, so a Streamlit page paints before, say, pypdf or
+# seaborn has been loaded, and branches that never run never pay for them.
+
+import importlib
+import sys
+import threading
+import time
+import types
+
+from metrics import REGISTRY
+
+_lock = threading.RLock()
+_modules = {}
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_module"]
+                if module is None:
+                    already_loaded = self.__name__ in sys.modules
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    if not already_loaded:
+                        REGISTRY.observe("lazy_import_seconds", time.perf_counter() - start,
+                                         help_text="Time spent on deferred imports",
+                                         module=self.__name__)
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name):
+    """Return a stand-in for module `name` that imports it on first use."""
+    with _lock:
+        if name not in _modules:
+            _modules[name] = LazyModule(name)
+        return _modules[name]
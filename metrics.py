@@ -0,0 +1,219 @@
+# metrics.py
+# In-process metrics for the LLM apps: how long each stage takes (file
+# parsing, splitting, the model call, rendering), model latency,
+# time-to-first-token and token counts.
+# Everything lands in process-wide histograms/counters that can be exported
+# as Prometheus text or JSONL, or shown in a Streamlit diagnostics panel.
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Bucket upper bounds in seconds (from 1 ms to 2 min)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 100000)
+
+
+# --- Metric types ---
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            if seen + count >= rank and count:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def snapshot(self):
+        return {"count": self.count, "sum": self.sum,
+                "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts))}
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return {"value": self.value}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}   # (name, labels) -> Histogram/Counter
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, labels, help_text, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = kind(**kwargs)
+                self._help.setdefault(name, help_text)
+            return metric
+
+    def observe(self, name, value, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+        metric = self._get(Histogram, name, labels, help_text, buckets=buckets)
+        with self._lock:
+            metric.observe(value)
+
+    def inc(self, name, amount=1, help_text="", **labels):
+        metric = self._get(Counter, name, labels, help_text)
+        with self._lock:
+            metric.inc(amount)
+
+    def items(self):
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda kv: kv[0])
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+    # --- Export ---
+    def to_prometheus(self):
+        lines = []
+        typed = set()
+        for (name, labels), metric in self.items():
+            if name not in typed:
+                typed.add(name)
+                if self._help.get(name):
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {'histogram' if isinstance(metric, Histogram) else 'counter'}")
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(list(metric.buckets) + ["+Inf"], metric.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {metric.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{_labels(labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self):
+        now = time.time()
+        lines = []
+        for (name, labels), metric in self.items():
+            record = {"ts": now, "name": name, "labels": dict(labels),
+                      "type": "histogram" if isinstance(metric, Histogram) else "counter"}
+            record.update(metric.snapshot())
+            lines.append(json.dumps(record))
+        return "\n".join(lines) + "\n"
+
+    def write_jsonl(self, path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(self.to_jsonl())
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry()
+
+
+# --- Stage timing ---
+@contextmanager
+def timed(stage, app="", registry=REGISTRY):
+    """Time a block of code as one stage of an app."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("stage_seconds", time.perf_counter() - start,
+                         help_text="Time spent in each app stage", app=app, stage=stage)
+
+
+# --- LangChain callback ---
+def __getattr__(name):
+    # The callback handler subclasses a langchain_core class, which is slow
+    # to import, so it lives in metrics_callbacks and is only loaded on use.
+    if name == "MetricsCallbackHandler":
+        from metrics_callbacks import MetricsCallbackHandler
+        return MetricsCallbackHandler
+    raise AttributeError(f"module 'metrics' has no attribute {name!r}")
+
+
+def llm_config(app, registry=REGISTRY):
+    """Runnable config that reports model metrics for this app."""
+    from metrics_callbacks import MetricsCallbackHandler
+    return {"callbacks": [MetricsCallbackHandler(app, registry)], "metadata": {"app": app}}
+
+
+# --- Streamlit panel ---
+def summary_rows(registry=REGISTRY, app=None):
+    """One row per histogram: count, mean and estimated p50/p95."""
+    rows = []
+    for (name, labels), metric in registry.items():
+        labels = dict(labels)
+        if app and labels.get("app") != app:
+            continue
+        if isinstance(metric, Histogram):
+            seconds = name.endswith("_seconds")
+            scale = 1000 if seconds else 1
+            rows.append({
+                "metric": name,
+                **{k: v for k, v in labels.items() if k != "app"},
+                "count": metric.count,
+                "mean": round(metric.sum / metric.count * scale, 2) if metric.count else None,
+                "p50": round(metric.quantile(0.5) * scale, 2),
+                "p95": round(metric.quantile(0.95) * scale, 2),
+                "unit": "ms" if seconds else "tokens",
+            })
+        else:
+            rows.append({"metric": name, **{k: v for k, v in labels.items() if k != "app"},
+                         "count": metric.value})
+    return rows
+
+
+def diagnostics_panel(app, registry=REGISTRY):
+    """Collapsible panel with this app's stage timings and export buttons."""
+    import streamlit as st
+
+    with st.expander("🩺 Diagnostics"):
+        rows = summary_rows(registry, app)
+        if not rows:
+            st.caption("No measurements yet.")
+            return
+        st.dataframe(rows, use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Prometheus metrics", registry.to_prometheus(),
+                               "metrics.prom", "text/plain")
+        with col2:
+            st.download_button("JSONL metrics", registry.to_jsonl(),
+                               "metrics.jsonl", "application/json")
@@ -0,0 +1,81 @@
+# metrics_callbacks.py
+# LangChain callback handler feeding model metrics into metrics.REGISTRY.
+# Kept apart from metrics.py so timing a stage doesn't import langchain_core.
+
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import REGISTRY, TOKEN_BUCKETS
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records model latency, time-to-first-token and token usage.
+
+    Time-to-first-token is only known when the model is streamed.
+    """
+
+    def __init__(self, app="", registry=REGISTRY):
+        self.app = app
+        self.registry = registry
+        self._runs = {}  # run_id -> [start, first_token_time, model]
+
+    def _start(self, run_id, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or params.get("_type", "unknown")
+        self._runs[run_id] = [time.perf_counter(), None, str(model)]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run and run[1] is None:
+            run[1] = time.perf_counter()
+            self.registry.observe("llm_time_to_first_token_seconds", run[1] - run[0],
+                                  help_text="Time until the model streamed its first token",
+                                  app=self.app, model=run[2])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        start, _, model = run
+        self.registry.observe("llm_latency_seconds", time.perf_counter() - start,
+                              help_text="Model call latency", app=self.app, model=model)
+
+        usage = _usage(response)
+        for kind in ("input", "output"):
+            tokens = usage.get(f"{kind}_tokens")
+            if tokens is None:
+                continue
+            self.registry.inc(f"llm_{kind}_tokens_total", tokens,
+                              help_text=f"Total {kind} tokens", app=self.app, model=model)
+            self.registry.observe(f"llm_{kind}_tokens", tokens, buckets=TOKEN_BUCKETS,
+                                  help_text=f"{kind.capitalize()} tokens per call",
+                                  app=self.app, model=model)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        model = run[2] if run else "unknown"
+        self.registry.inc("llm_errors_total", help_text="Failed model calls",
+                          app=self.app, model=model, error=type(error).__name__)
+
+
+def _usage(response):
+    """Token usage from an LLMResult, wherever the provider put it."""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                return usage
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("usage_metadata") or llm_output.get("token_usage") or {}
+    return {
+        "input_tokens": usage.get("input_tokens", usage.get("prompt_tokens")),
+        "output_tokens": usage.get("output_tokens", usage.get("completion_tokens")),
+    }
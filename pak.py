@@ -1,10 +1,23 @@
 import streamlit as st
-from langchain_community.tools import DuckDuckGoSearchRun
 import pandas as pd
 from datetime import datetime
 
-# Initialize search tool
-search = DuckDuckGoSearchRun()
+from lazy import lazy_import
+from metrics import diagnostics_panel
+from singleflight import group, normalize_key
+
+APP = "pak"
+
+ddg_search = lazy_import("langchain_community.tools.ddg_search.tool")
+
+
+# Initialize search tool on first search (one per process)
+@st.cache_resource
+def get_search():
+    return ddg_search.DuckDuckGoSearchRun()
+
+# Sessions running the same search at the same time share one DuckDuckGo call
+searches = group("search", APP)
 
 # Configure app
 st.set_page_config(
@@ -113,7 +126,7 @@ with st.container():
 def perform_search(query, num_results):
     with st.spinner(f"Searching for: {query}"):
         try:
-            results = search.run(query)
+            results = searches.do(normalize_key(query), get_search().run, query)
             
             if not results:
                 st.warning("No results found. Try different search terms.")
@@ -221,6 +234,8 @@ for i, (topic, icon) in enumerate(quick_topics.items()):
 if hasattr(st.session_state, "quick_search"):
     perform_search(st.session_state.quick_search, st.session_state.num_results)
 
+diagnostics_panel(APP)
+
 # Footer
 st.divider()
 st.caption(f"© {datetime.now().year} Pakistan News Explorer | Powered by DuckDuckGo Search")
\ No newline at end of file
@@ -0,0 +1,138 @@
+# pipeline.py
+# The split -> prompt -> model -> parse pieces shared by app.py, text.py,
+# quiz.py and prompt_ui.py, kept free of Streamlit so they can also run
+# headless (benchmarks, batch jobs).
+
+import os
+from functools import lru_cache
+
+from lazy import lazy_import
+from ratelimit import limited
+
+# Imported on first use, so pages render before LangChain is loaded
+output_parsers = lazy_import("langchain_core.output_parsers")
+prompts = lazy_import("langchain_core.prompts")
+splitters = lazy_import("langchain_text_splitters")
+google_genai = lazy_import("langchain_google_genai")
+
+SPLIT_STRATEGIES = (
+    "None",
+    "Length-Based",
+    "Text Structure-Based",
+    "Document Structure-Based",
+    "Semantic Meaning-Based"
+)
+
+SUMMARY_TEMPLATE = "Write a summary for the following content:\n\n{poem}"
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template.json")
+
+# Prompt template: only questions, numbered format
+QUESTION_TEMPLATE = """
+You are a quiz question generator.
+
+Based on the following content, generate exactly {num} multiple-choice quiz questions. 
+Only generate the questions — no answer options or answers.
+
+Strictly use the following format:
+Q1. <question>
+Q2. <question>
+...
+Q{num}. <question>
+
+Content:
+\"\"\"{content}\"\"\"
+"""
+
+QUIZ_CONTENT_LIMIT = 8000
+
+QA_TEMPLATE = """Answer the question using only the context below.
+If the context does not contain the answer, say so.
+
+Context:
+{context}
+
+Question: {question}"""
+
+
+# --- Splitting (text.py) ---
+def split_docs(docs, strategy, chunk_size, chunk_overlap):
+    if strategy == "Length-Based":
+        splitter = splitters.CharacterTextSplitter(
+            separator="\n",
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        return splitter.split_documents(docs)
+
+    elif strategy == "Text Structure-Based":
+        splitter = splitters.RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        return splitter.split_documents(docs)
+
+    elif strategy == "Document Structure-Based":
+        splitter = splitters.MarkdownHeaderTextSplitter(
+            headers_to_split_on=[("#", "H1"), ("##", "H2"), ("###", "H3")]
+        )
+        split_output = []
+        for doc in docs:
+            split_output.extend(splitter.split_text(doc.page_content))
+        return split_output
+
+    elif strategy == "Semantic Meaning-Based":
+        splitter = splitters.SentenceTransformersTokenTextSplitter(
+            model_name="all-MiniLM-L6-v2",
+            tokens_per_chunk=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        return splitter.split_documents(docs)
+
+    else:
+        return docs
+
+
+# --- Model ---
+def gemini_model(model="gemini-1.5-pro", priority="interactive", **kwargs):
+    """Gemini chat model behind the process-wide rate limiter. Batch jobs
+    pass priority="batch" so pages being used interactively go first."""
+    return limited(google_genai.ChatGoogleGenerativeAI(model=model, **kwargs), priority)
+
+
+# --- Summaries (app.py, text.py) ---
+def summary_chain(model, template=SUMMARY_TEMPLATE):
+    prompt = prompts.PromptTemplate(template=template, input_variables=["poem"])
+    return prompt | model | output_parsers.StrOutputParser()
+
+
+# --- Question answering over retrieved chunks (text.py) ---
+def qa_chain(model, template=QA_TEMPLATE):
+    prompt = prompts.PromptTemplate(template=template, input_variables=["context", "question"])
+    return prompt | model | output_parsers.StrOutputParser()
+
+
+def format_context(chunks):
+    return "\n\n---\n\n".join(chunk["text"] for chunk in chunks)
+
+
+# --- Quiz questions (quiz.py) ---
+@lru_cache(maxsize=None)
+def question_prompt():
+    return prompts.PromptTemplate(input_variables=["content", "num"], template=QUESTION_TEMPLATE)
+
+
+def quiz_prompt(content, num):
+    return question_prompt().format(content=content[:QUIZ_CONTENT_LIMIT], num=num)
+
+
+def parse_questions(response):
+    """Pull the "Q1. ..." lines out of the model's reply."""
+    # Extract .content from Gemini's response safely
+    result_text = getattr(response, 'content', str(response)).strip()
+    return [line.strip() for line in result_text.split("\n") if line.strip().startswith("Q")]
+
+
+# --- Research prompt (prompt_ui.py) ---
+def research_prompt(path=TEMPLATE_PATH):
+    return prompts.load_prompt(path)
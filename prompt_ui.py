@@ -1,14 +1,13 @@
 # LLMS, CHATBOT
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-
 from dotenv import load_dotenv
 import streamlit as st
-from langchain_core.prompts import PromptTemplate,load_prompt
 
-load_dotenv()
+from pipeline import gemini_model, research_prompt
+from metrics import diagnostics_panel, llm_config, timed
+from singleflight import group, normalize_key
 
-model = ChatGoogleGenerativeAI(model='Gemini 1.5 Flash')
+load_dotenv()
 
 st.header('Reasearch Tool')
 
@@ -19,15 +18,20 @@ style_input = st.selectbox( "Select Explanation Style", ["Beginner-Friendly", "T
 
 length_input = st.selectbox( "Select Explanation Length", ["Short (1-2 paragraphs)", "Medium (3-5 paragraphs)", "Long (detailed explanation)"] )
 
-template = load_prompt('template.json')
-
-
-
 if st.button('Summarize'):
+    # Prompt and model are only loaded once they're needed
+    template = research_prompt()
+    model = gemini_model('Gemini 1.5 Flash')
     chain = template | model
-    result = chain.invoke({
+    inputs = {
         'paper_input':paper_input,
         'style_input':style_input,
         'length_input':length_input
-    })
+    }
+    # Identical inputs sent from other sessions meanwhile share this call
+    with timed('model', 'prompt_ui'):
+        result = group('research', 'prompt_ui').do(
+            normalize_key(inputs), chain.invoke, inputs, config=llm_config('prompt_ui'))
     st.write(result.content)
+
+diagnostics_panel('prompt_ui')
@@ -1,11 +1,12 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-import docx2txt
-import PyPDF2
 
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from ingestion import ingest_uploads
+from pipeline import gemini_model, parse_questions, quiz_prompt
+from metrics import diagnostics_panel, llm_config, timed
+
+APP = "quiz"
 
 # Load Google API key
 load_dotenv()
@@ -14,67 +15,47 @@ if not GOOGLE_API_KEY:
     st.error("Google API key not found in .env file.")
     st.stop()
 
-# Function to extract text from uploaded files
-def extract_text(file):
-    if file.name.endswith(".pdf"):
-        reader = PyPDF2.PdfReader(file)
-        return "\n".join([page.extract_text() or "" for page in reader.pages])
-    elif file.name.endswith(".docx"):
-        return docx2txt.process(file)
-    elif file.name.endswith(".txt"):
-        return file.read().decode("utf-8")
-    else:
-        return ""
-
-# Prompt template: only questions, numbered format
-QUESTION_PROMPT = PromptTemplate(
-    input_variables=["content", "num"],
-    template="""
-You are a quiz question generator.
-
-Based on the following content, generate exactly {num} multiple-choice quiz questions. 
-Only generate the questions — no answer options or answers.
-
-Strictly use the following format:
-Q1. <question>
-Q2. <question>
-...
-Q{num}. <question>
-
-Content:
-\"\"\"{content}\"\"\"
-"""
-)
+# Extract text from all uploaded files (parsed in parallel, kept in upload order)
+def extract_text(files):
+    texts = {}
+    for result in ingest_uploads(files):
+        if result.error:
+            st.warning(f"Could not read {result.name}: {result.error}")
+        else:
+            texts[result.index] = "\n".join(doc.page_content for doc in result.documents)
+    return "\n".join(texts[i] for i in range(len(files)) if i in texts)
 
 # Streamlit UI
 st.title("📘 AI Quiz Question Generator (Questions Only)")
-uploaded_file = st.file_uploader("Upload a document (PDF, DOCX, or TXT)", type=["pdf", "docx", "txt"])
+uploaded_files = st.file_uploader("Upload documents (PDF, DOCX, or TXT)", type=["pdf", "docx", "txt"], accept_multiple_files=True)
 num_questions = st.number_input("Number of Questions", min_value=1, max_value=50, value=5)
 
-if uploaded_file and st.button("Generate Questions"):
-    with st.spinner("Extracting text from file..."):
-        content = extract_text(uploaded_file)
+if uploaded_files and st.button("Generate Questions"):
+    with st.spinner("Extracting text from files..."):
+        with timed("parse_files", APP):
+            content = extract_text(uploaded_files)
 
     if not content.strip():
         st.error("No readable text found in the file.")
     else:
         with st.spinner("Generating questions using Gemini..."):
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-pro",
+            llm = gemini_model(
+                "gemini-1.5-pro",
                 temperature=0.3,
                 google_api_key=GOOGLE_API_KEY
             )
 
-            prompt = QUESTION_PROMPT.format(content=content[:8000], num=num_questions)
-            response = llm.invoke(prompt)
+            prompt = quiz_prompt(content, num_questions)
+            with timed("model", APP):
+                response = llm.invoke(prompt, config=llm_config(APP))
+            with timed("parse", APP):
+                questions = parse_questions(response)
 
-            # Extract .content from Gemini's response safely
-            result_text = getattr(response, 'content', str(response)).strip()
-
-            if not result_text:
+            if not questions:
                 st.error("No questions generated. Please try again.")
             else:
                 st.markdown("### 🧠 Generated Questions:")
-                for line in result_text.split("\n"):
-                    if line.strip().startswith("Q"):
-                        st.markdown(f"- {line.strip()}")
+                for line in questions:
+                    st.markdown(f"- {line}")
+
+diagnostics_panel(APP)
@@ -0,0 +1,378 @@
+# ratelimit.py
+# One limiter shared by every Gemini call on this machine (all Streamlit
+# sessions, batch.py workers, in any process), so concurrent use stays inside
+# the quota instead of each caller finding it with a 429.
+#   - Two token buckets: requests per minute and tokens per minute. The token
+#     cost is estimated before the call and settled from usage afterwards.
+#   - AIMD concurrency: the number of calls allowed at once grows by about
+#     one per round of successful calls and halves on a 429/503, which also
+#     pauses new calls for a moment.
+#   - Callers wait in one priority queue: interactive pages go before batch.
+# The buckets, concurrency and queue live in a SQLite file (.ratelimit/ by
+# default), which is how separate processes share them. Processes on other
+# machines need their own quota split. Rows left behind by a process that
+# died expire: queue entries once their owner stops polling, slots after
+# lease_seconds. A caller that can't start within queue_timeout gets
+# LimiterTimeout.
+# Queue waits land in metrics.REGISTRY as llm_queue_wait_seconds.
+#
+# Limits come from GEMINI_RPM, GEMINI_TPM, GEMINI_MAX_CONCURRENCY and
+# GEMINI_QUEUE_TIMEOUT, the state file from GEMINI_LIMITER_DB.
+#
+#   python ratelimit.py            # load test against a stub that answers 429
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+
+from metrics import REGISTRY, Registry, summary_rows
+
+PRIORITIES = {"interactive": 0, "batch": 10}
+
+RATE_LIMIT_CODES = (429, 503)
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ratelimit", "gemini.sqlite")
+
+POLL_INTERVAL = 0.05  # seconds between checks while waiting on another process
+WAITING_TTL = 10.0  # a queue entry not polled for this long belongs to a dead process
+
+
+class LimiterTimeout(TimeoutError):
+    """The call waited longer than queue_timeout for the limiter."""
+
+
+def is_rate_limited(error):
+    """True for quota / overload errors (HTTP 429 or 503, gRPC
+    RESOURCE_EXHAUSTED), whatever client raised them."""
+    # Only loaded if the Gemini client is, and only then can it have raised one
+    google_errors = sys.modules.get("google.api_core.exceptions")
+    if google_errors is not None and isinstance(
+            error, (google_errors.ResourceExhausted, google_errors.ServiceUnavailable)):
+        return True
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        if isinstance(code, int) and code in RATE_LIMIT_CODES:
+            return True
+    # Wrapped errors keep the gRPC status name in their message; numbers alone
+    # ("429") also turn up in unrelated messages
+    return "RESOURCE_EXHAUSTED" in str(error)
+
+
+def estimate_tokens(text):
+    """Rough token count for a prompt (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+SCHEMA_VERSION = 2  # 1 tagged queue entries and slots with a pid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS control (id INTEGER PRIMARY KEY CHECK (id = 1), concurrency REAL NOT NULL,
+                                    paused_until REAL NOT NULL, last_decrease REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS waiting (id INTEGER PRIMARY KEY AUTOINCREMENT, priority INTEGER NOT NULL,
+                                    owner TEXT NOT NULL, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (id INTEGER PRIMARY KEY AUTOINCREMENT, owner TEXT NOT NULL,
+                                   expires REAL NOT NULL);
+"""
+
+
+class Ticket:
+    """One admitted call. Set used_tokens once the real usage is known."""
+
+    def __init__(self, priority, tokens, waited, lease):
+        self.priority = priority
+        self.tokens = tokens
+        self.waited = waited
+        self.lease = lease
+        self.used_tokens = None
+
+
+class AdaptiveLimiter:
+    """Limiter whose state lives in a SQLite file, so every process that
+    opens the same file (Streamlit servers, batch.py runs) shares one budget
+    and one queue. All of them should use the same GEMINI_* limits."""
+
+    def __init__(self, path=DB_PATH, requests_per_minute=60, tokens_per_minute=1_000_000,
+                 max_concurrency=8, min_concurrency=1, initial_concurrency=2, burst_seconds=10.0,
+                 decrease=0.5, cooldown=1.0, lease_seconds=300.0, queue_timeout=120.0, registry=REGISTRY):
+        self.path = path
+        self.owner = uuid.uuid4().hex  # tags this limiter's rows; pids get reused
+        # name -> (refill per second, capacity)
+        self.buckets = {
+            "requests": (requests_per_minute / 60, max(1.0, requests_per_minute / 60 * burst_seconds)),
+            "tokens": (tokens_per_minute / 60, max(1.0, tokens_per_minute / 60 * burst_seconds)),
+        }
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.decrease = decrease
+        self.cooldown = cooldown
+        # A slot not released within lease_seconds is given back: its
+        # process has died, or the call hung (then one extra call can start)
+        self.lease_seconds = lease_seconds
+        self.queue_timeout = queue_timeout
+        self.registry = registry
+        self._local = threading.local()  # one connection per thread
+        self._wake = threading.Condition()  # wakes waiters in this process early
+        self._last_reap = 0.0
+
+        with self._transaction() as db:
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Queue entries and slots are short-lived: start them afresh
+                db.execute("DROP TABLE IF EXISTS waiting")
+                db.execute("DROP TABLE IF EXISTS leases")
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    db.execute(statement)
+            start = min(max_concurrency, max(min_concurrency, initial_concurrency))
+            db.execute("INSERT OR IGNORE INTO control VALUES (1, ?, 0, 0)", (start,))
+            for name, (_, capacity) in self.buckets.items():
+                db.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)", (name, capacity, time.time()))
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(path=os.getenv("GEMINI_LIMITER_DB", DB_PATH),
+                   requests_per_minute=float(os.getenv("GEMINI_RPM", 60)),
+                   tokens_per_minute=float(os.getenv("GEMINI_TPM", 1_000_000)),
+                   max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", 8)),
+                   queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT", 120)), **kwargs)
+
+    # --- Shared state ---
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _level(self, db, name, now):
+        rate, capacity = self.buckets[name]
+        level, updated = db.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        return min(capacity, level + max(0.0, now - updated) * rate)
+
+    def _set_level(self, db, name, level, now):
+        """Store a new level. It may go below zero, which later callers wait out."""
+        db.execute("UPDATE buckets SET level = ?, updated = ? WHERE name = ?",
+                   (min(self.buckets[name][1], level), now, name))
+
+    def _delay(self, name, level, amount):
+        """Seconds until `amount` is available. A request bigger than the
+        whole bucket waits for a full one."""
+        rate, capacity = self.buckets[name]
+        amount = min(amount, capacity)
+        return 0.0 if level >= amount else (amount - level) / rate
+
+    def _reap(self, db, now):
+        """Drop expired queue entries and slots (left behind by processes
+        that died)."""
+        if time.monotonic() - self._last_reap < 1.0:
+            return
+        self._last_reap = time.monotonic()
+        for table in ("waiting", "leases"):
+            db.execute(f"DELETE FROM {table} WHERE expires < ?", (now,))
+
+    # --- Admission ---
+    def _try_start(self, waiting_id, priority, tokens):
+        """Start the call if it is first in line and allowed now. Returns
+        (lease id or None, seconds worth waiting before trying again)."""
+        with self._transaction() as db:
+            now = time.time()
+            # Polling keeps our queue entry alive; put it back (same place in
+            # line) if it was reaped while this process was stalled
+            db.execute("INSERT OR REPLACE INTO waiting VALUES (?, ?, ?, ?)",
+                       (waiting_id, priority, self.owner, now + WAITING_TTL))
+            self._reap(db, now)
+            head = db.execute("SELECT id FROM waiting ORDER BY priority, id LIMIT 1").fetchone()
+            if head is None or head[0] != waiting_id:
+                return None, POLL_INTERVAL
+            concurrency, paused_until = db.execute("SELECT concurrency, paused_until FROM control").fetchone()
+            in_flight = db.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+            if in_flight >= int(concurrency):
+                return None, POLL_INTERVAL
+            requests = self._level(db, "requests", now)
+            token_level = self._level(db, "tokens", now)
+            wait = max(paused_until - now, self._delay("requests", requests, 1),
+                       self._delay("tokens", token_level, tokens))
+            if wait > 0:
+                return None, wait
+            self._set_level(db, "requests", requests - 1, now)
+            self._set_level(db, "tokens", token_level - tokens, now)
+            db.execute("DELETE FROM waiting WHERE id = ?", (waiting_id,))
+            lease = db.execute("INSERT INTO leases (owner, expires) VALUES (?, ?)",
+                               (self.owner, now + self.lease_seconds)).lastrowid
+            return lease, 0.0
+
+    def acquire(self, priority="interactive", tokens=0, app="", timeout=None):
+        """Block until this call may start: it is first in the queue, a
+        concurrency slot is free and both buckets have room. Raises
+        LimiterTimeout after `timeout` seconds (default queue_timeout)."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}, expected one of: {', '.join(PRIORITIES)}")
+        timeout = self.queue_timeout if timeout is None else timeout
+        enqueued = time.monotonic()
+        with self._transaction() as db:
+            waiting_id = db.execute("INSERT INTO waiting (priority, owner, expires) VALUES (?, ?, ?)",
+                                    (PRIORITIES[priority], self.owner, time.time() + WAITING_TTL)).lastrowid
+        try:
+            while True:
+                lease, wait = self._try_start(waiting_id, PRIORITIES[priority], tokens)
+                if lease is not None:
+                    break
+                left = enqueued + timeout - time.monotonic()
+                if left <= 0:
+                    self.registry.inc("llm_queue_timeouts_total",
+                                      help_text="Model calls that gave up waiting for the rate limiter",
+                                      app=app, priority=priority)
+                    stats = self.stats()
+                    raise LimiterTimeout(f"Gave up after waiting {timeout:g}s for the Gemini rate limiter "
+                                         f"({stats['in_flight']} calls running, {stats['queued'] - 1} others waiting)")
+                # Other processes can't notify us, so poll; local releases wake us sooner
+                with self._wake:
+                    self._wake.wait(min(wait, POLL_INTERVAL, left))
+        except BaseException:
+            with self._transaction() as db:
+                db.execute("DELETE FROM waiting WHERE id = ?", (waiting_id,))
+            raise
+        with self._wake:
+            self._wake.notify_all()  # the next caller may be able to start too
+        waited = time.monotonic() - enqueued
+        self.registry.observe("llm_queue_wait_seconds", waited,
+                              help_text="Time model calls waited for the rate limiter",
+                              app=app, priority=priority)
+        return Ticket(priority, tokens, waited, lease)
+
+    def release(self, ticket, throttled=False, app=""):
+        with self._transaction() as db:
+            now = time.time()
+            db.execute("DELETE FROM leases WHERE id = ?", (ticket.lease,))
+            if ticket.used_tokens is not None:
+                level = self._level(db, "tokens", now)
+                self._set_level(db, "tokens", level - (ticket.used_tokens - ticket.tokens), now)
+            concurrency, paused_until, last_decrease = db.execute(
+                "SELECT concurrency, paused_until, last_decrease FROM control").fetchone()
+            if throttled:
+                # Calls rejected together are one signal: decrease once per cooldown
+                if now - last_decrease >= self.cooldown:
+                    concurrency = max(self.min_concurrency, concurrency * self.decrease)
+                    last_decrease = now
+                    paused_until = max(paused_until, now + self.cooldown)
+            else:
+                concurrency = min(self.max_concurrency, concurrency + 1 / concurrency)
+            db.execute("UPDATE control SET concurrency = ?, paused_until = ?, last_decrease = ?",
+                       (concurrency, paused_until, last_decrease))
+        with self._wake:
+            self._wake.notify_all()
+        if throttled:
+            self.registry.inc("llm_throttled_total", help_text="Model calls rejected with 429/503",
+                              app=app, priority=ticket.priority)
+
+    @contextmanager
+    def slot(self, priority="interactive", tokens=0, app=""):
+        ticket = self.acquire(priority, tokens, app)
+        try:
+            yield ticket
+        except BaseException as e:
+            self.release(ticket, throttled=is_rate_limited(e), app=app)
+            raise
+        else:
+            self.release(ticket, app=app)
+
+    def stats(self):
+        db = self._db()
+        concurrency = db.execute("SELECT concurrency FROM control").fetchone()[0]
+        return {"limit": round(concurrency, 2),
+                "in_flight": db.execute("SELECT COUNT(*) FROM leases").fetchone()[0],
+                "queued": db.execute("SELECT COUNT(*) FROM waiting").fetchone()[0]}
+
+
+@lru_cache(maxsize=None)
+def shared_limiter():
+    """The limiter every Gemini call goes through (created on first use)."""
+    return AdaptiveLimiter.from_env()
+
+
+def limited(model, priority="interactive", limiter=None, max_retries=3):
+    """Wrap a chat model so every invoke/stream goes through the limiter."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}, expected one of: {', '.join(PRIORITIES)}")
+    from ratelimit_models import LimitedChatModel
+    return LimitedChatModel(model, priority, limiter or shared_limiter(), max_retries)
+
+
+# --- Load test ---
+def load_test(interactive=4, batch=16, calls=5, rps=10, concurrency=4, latency=0.2, use_limiter=True):
+    """Interactive and batch clients hammer a stub with a fixed quota.
+    Returns outcomes and the queue wait per priority."""
+    from fake_llm import QuotaFakeChatModel
+
+    registry = Registry()
+    stub = QuotaFakeChatModel(latency=latency, max_concurrency=concurrency, requests_per_second=rps)
+    limiter = AdaptiveLimiter(os.path.join(tempfile.mkdtemp(prefix="ratelimit_"), "state.sqlite"),
+                              requests_per_minute=rps * 60, max_concurrency=concurrency * 2,
+                              burst_seconds=1.0, registry=registry)
+    outcomes = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def client(priority):
+        model = limited(stub, priority, limiter) if use_limiter else stub
+        for i in range(calls):
+            try:
+                model.invoke(f"{priority} request {i}")
+                outcome = "ok"
+            except Exception:
+                outcome = "failed"
+            with lock:
+                outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=client, args=("batch",)) for _ in range(batch)]
+    threads += [threading.Thread(target=client, args=("interactive",)) for _ in range(interactive)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    waits = {row["priority"]: row for row in summary_rows(registry)
+             if row["metric"] == "llm_queue_wait_seconds"}
+    return {**outcomes, **stub.stats(), "seconds": time.perf_counter() - start,
+            "limit": limiter.stats()["limit"], "waits": waits}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the limiter against a stub that answers 429")
+    parser.add_argument("--interactive", type=int, default=4, help="interactive clients")
+    parser.add_argument("--batch", type=int, default=16, help="batch clients")
+    parser.add_argument("--calls", type=int, default=5, help="calls per client")
+    parser.add_argument("--rps", type=float, default=10, help="stub quota: requests per second")
+    parser.add_argument("--concurrency", type=int, default=4, help="stub quota: calls at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub latency (s)")
+    args = parser.parse_args()
+
+    for use_limiter in (False, True):
+        r = load_test(args.interactive, args.batch, args.calls, args.rps, args.concurrency,
+                      args.latency, use_limiter)
+        print(f"\n{'limiter' if use_limiter else 'direct'}: ok {r['ok']}  failed {r['failed']}  "
+              f"429s from stub {r['throttled']}  {r['seconds']:.2f}s")
+        if use_limiter:
+            print(f"  concurrency limit at the end: {r['limit']}")
+            for priority, row in sorted(r["waits"].items()):
+                print(f"  queue wait {priority:<12} p50 {row['p50']:8.1f} ms   p95 {row['p95']:8.1f} ms")
@@ -0,0 +1,73 @@
+# ratelimit_models.py
+# Runnable wrapper that sends a chat model's calls through ratelimit's
+# shared limiter. Kept apart from ratelimit.py so importing the limiter
+# doesn't import langchain_core.
+
+from langchain_core.runnables import Runnable
+
+from ratelimit import estimate_tokens, is_rate_limited
+
+
+def _prompt_text(model, value):
+    try:
+        return model._convert_input(value).to_string()
+    except Exception:
+        return str(value)
+
+
+def _total_tokens(message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+class LimitedChatModel(Runnable):
+    """Drop-in for the wrapped model in `prompt | model | parser` chains.
+
+    Calls rejected with 429/503 are retried after the limiter backs off; a
+    stream is only retried if it failed before the first chunk.
+    """
+
+    def __init__(self, model, priority, limiter, max_retries=3):
+        self.model = model
+        self.priority = priority
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    @property
+    def InputType(self):
+        return self.model.InputType
+
+    @property
+    def OutputType(self):
+        return self.model.OutputType
+
+    def _slot(self, value, config):
+        app = ((config or {}).get("metadata") or {}).get("app", "")
+        return self.limiter.slot(self.priority, estimate_tokens(_prompt_text(self.model, value)), app)
+
+    def invoke(self, input, config=None, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._slot(input, config) as ticket:
+                    result = self.model.invoke(input, config, **kwargs)
+                    ticket.used_tokens = _total_tokens(result)
+                return result
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limited(e):
+                    raise
+
+    def stream(self, input, config=None, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                with self._slot(input, config) as ticket:
+                    used = 0
+                    for chunk in self.model.stream(input, config, **kwargs):
+                        started = True
+                        used += _total_tokens(chunk) or 0
+                        yield chunk
+                    ticket.used_tokens = used or None
+                return
+            except Exception as e:
+                if started or attempt == self.max_retries or not is_rate_limited(e):
+                    raise
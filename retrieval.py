@@ -0,0 +1,184 @@
+# retrieval.py
+# In-process vector index over the chunks produced by pipeline.split_docs, so
+# text.py can send Gemini only the chunks relevant to a question instead of
+# a hand-picked page or the whole document.
+# Chunks are embedded into one contiguous float32 NumPy matrix (rows are
+# L2-normalised, so a matrix product gives cosine similarity) and searched in
+# batches. Indexes are saved to disk under a hash of the chunks and embedder;
+# only the MAX_CACHED_INDEXES most recently used are kept in .index_cache/
+# (delete the directory to clear it).
+
+import hashlib
+import json
+import os
+import re
+import zlib
+
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+sentence_transformers = lazy_import("sentence_transformers")
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".index_cache")
+MAX_CACHED_INDEXES = 50  # least recently used indexes beyond this are deleted
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+# --- Embedders ---
+class HashingEmbedder:
+    """Bag of words + bigrams hashed into a fixed number of columns.
+
+    Needs no model download and is deterministic across processes (crc32,
+    not Python's salted hash()), so saved indexes stay valid.
+    """
+
+    def __init__(self, n_features=4096):
+        self.n_features = n_features
+        self.name = f"hashing-{n_features}"
+
+    def _features(self, text):
+        words = TOKEN.findall(text.lower())
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return [zlib.crc32(g.encode("utf-8")) for g in grams]
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(self._features(text), dtype=np.uint32)
+            if not hashes.size:
+                continue
+            columns = (hashes % self.n_features).astype(np.intp)
+            # Top bit picks the sign so colliding features tend to cancel out
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            matrix[row] = np.bincount(columns, weights=signs, minlength=self.n_features)
+        # Sub-linear term frequency, so repeated words don't dominate
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        return _normalize(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """Local CPU embedding model (same model as the semantic splitter)."""
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        self.model = sentence_transformers.SentenceTransformer(model_name, device="cpu")
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=64, convert_to_numpy=True)
+        return _normalize(vectors.astype(np.float32))
+
+
+EMBEDDERS = {
+    "Hashed features (fast)": HashingEmbedder,
+    "MiniLM (local model)": SentenceTransformerEmbedder,
+}
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+# --- Index ---
+class VectorIndex:
+    def __init__(self, matrix, chunks, embedder_name):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.chunks = chunks  # [{"text": ..., "metadata": {...}}]
+        self.embedder_name = embedder_name
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @classmethod
+    def build(cls, docs, embedder):
+        chunks = [{"text": d.page_content, "metadata": dict(d.metadata)} for d in docs]
+        matrix = embedder.embed([c["text"] for c in chunks])
+        return cls(matrix, chunks, embedder.name)
+
+    def search(self, query_vectors, k=4):
+        """Top-k chunks for each query row, as lists of (score, chunk index).
+
+        All queries are scored with one matrix product; argpartition then
+        picks the k best per row without sorting every chunk.
+        """
+        query_vectors = np.atleast_2d(query_vectors).astype(np.float32, copy=False)
+        scores = query_vectors @ self.matrix.T
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in range(len(query_vectors))]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [list(zip(s.tolist(), i.tolist())) for s, i in zip(top_scores, top)]
+
+    def query(self, questions, embedder, k=4, min_score=0.0):
+        """Embed the questions and return the matching chunks for each.
+
+        Chunks scoring min_score or less (nothing in common) are dropped.
+        """
+        results = self.search(embedder.embed(questions), k)
+        return [[dict(self.chunks[i], score=score) for score, i in hits if score > min_score]
+                for hits in results]
+
+    # --- Persistence ---
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(path + ".npy", self.matrix)
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder_name, "chunks": self.chunks}, f, default=str)
+
+    @classmethod
+    def load(cls, path):
+        with open(path + ".json", encoding="utf-8") as f:
+            data = json.load(f)
+        matrix = np.load(path + ".npy", mmap_mode="r")
+        return cls(matrix, data["chunks"], data["embedder"])
+
+
+def index_key(docs, embedder):
+    """Hash of the chunk texts and the embedder, used as the file name."""
+    digest = hashlib.sha256(embedder.name.encode("utf-8"))
+    for doc in docs:
+        digest.update(hashlib.sha256(doc.page_content.encode("utf-8")).digest())
+    return digest.hexdigest()[:32]
+
+
+def prune_cache(cache_dir=CACHE_DIR, keep=MAX_CACHED_INDEXES):
+    """Delete all but the `keep` most recently used indexes in cache_dir."""
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return
+    entries = {}
+    for name in names:
+        key, ext = os.path.splitext(name)
+        if ext in (".json", ".npy"):
+            mtime = os.path.getmtime(os.path.join(cache_dir, name))
+            entries[key] = max(entries.get(key, 0), mtime)
+    for key in sorted(entries, key=entries.get, reverse=True)[keep:]:
+        for ext in (".json", ".npy"):
+            try:
+                os.remove(os.path.join(cache_dir, key + ext))
+            except OSError:
+                pass  # already gone, or still mapped by another session (Windows)
+
+
+def load_or_build(docs, embedder, cache_dir=CACHE_DIR, keep=MAX_CACHED_INDEXES):
+    """Load the saved index for these chunks, or build and save it.
+    The cache keeps the `keep` most recently used indexes."""
+    path = os.path.join(cache_dir, index_key(docs, embedder))
+    if os.path.exists(path + ".json") and os.path.exists(path + ".npy"):
+        try:
+            index = VectorIndex.load(path)
+            os.utime(path + ".json")  # mark as recently used
+            return index
+        except (OSError, ValueError):
+            pass  # damaged cache entry: rebuild below
+    index = VectorIndex.build(docs, embedder)
+    index.save(path)
+    prune_cache(cache_dir, keep)
+    return index
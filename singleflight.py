@@ -0,0 +1,189 @@
+# singleflight.py
+# Process-wide coalescing of identical in-flight requests.
+# Streamlit runs every browser session in the same process, so when several
+# users hit the same quick search in pak.py, or send the same inputs through
+# prompt_ui.py, at the same moment, only the first request calls the backend.
+# The others wait for that call and get its result (or its exception).
+# Nothing is cached: once the call finishes, the next request starts a new one.
+#
+#   python singleflight.py --clients 50 --keys 3   # load test with stub backends
+
+import argparse
+import json
+import threading
+import time
+
+from metrics import REGISTRY
+
+_lock = threading.Lock()
+_groups = {}
+
+
+def normalize_key(*parts):
+    """Key for a request: strings are case-folded with whitespace collapsed,
+    so "Pakistan  Sports news" and "pakistan sports news" share a call."""
+    return json.dumps([_normalize(p) for p in parts], sort_keys=True, default=str)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class LeaderAborted(RuntimeError):
+    """The shared call was interrupted (Ctrl+C, or a Streamlit rerun/stop in
+    the session that was running it), so there is no result to hand out.
+    Waiters then retry the call instead of returning nothing."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name, app="", registry=REGISTRY):
+        self.name = name
+        self.app = app
+        self.registry = registry
+        self.requests = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless a call with the same key is already
+        running, in which case wait for it and return its result."""
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        self.registry.inc("singleflight_requests_total",
+                          help_text="Requests through a single-flight group, by whether they called the backend",
+                          app=self.app, group=self.name, role="leader" if leader else "coalesced")
+
+        if not leader:
+            start = time.perf_counter()
+            call.done.wait()
+            self.registry.observe("singleflight_wait_seconds", time.perf_counter() - start,
+                                  help_text="Time coalesced requests waited for the shared call",
+                                  app=self.app, group=self.name)
+            if isinstance(call.error, LeaderAborted):
+                # Another session's rerun/stop isn't this request's failure:
+                # make the call again (one of the waiters becomes the leader)
+                return self.do(key, fn, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException as e:
+            # Don't pass the leader's interrupt/rerun on to other sessions
+            call.error = LeaderAborted(f"Shared call was aborted: {type(e).__name__}")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "coalesced": self.coalesced,
+                    "backend_calls": self.requests - self.coalesced, "in_flight": len(self._calls)}
+
+
+def group(name, app=""):
+    """The process-wide SingleFlight called `name` (created on first use)."""
+    with _lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name, app)
+        return _groups[name]
+
+
+# --- Load test ---
+class StubSearch:
+    """Stands in for DuckDuckGoSearchRun: fixed latency, counts backend calls."""
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def run(self, query):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return "\n".join(f"{query} result {i} https://example.com/{i}" for i in range(10))
+
+
+def _stub_prompt_backend(latency):
+    from fake_llm import FakeChatModel
+    from pipeline import research_prompt
+    return research_prompt() | FakeChatModel(latency=latency)
+
+
+def load_test(clients=50, keys=3, latency=0.2, coalesce=True):
+    """Fire `clients` concurrent requests spread over `keys` distinct inputs
+    at both stub backends. Returns backend calls and wall time per backend."""
+    search = StubSearch(latency)
+    chain = _stub_prompt_backend(latency)
+    prompt_calls = []
+    flights = {"search": SingleFlight("search"), "prompt": SingleFlight("prompt")}
+
+    def ask(inputs):
+        prompt_calls.append(1)
+        return chain.invoke(inputs)
+
+    def client(i):
+        topic = f"Pakistan topic{i % keys} news"
+        query = topic.upper() if i % 2 else topic  # same request, different spelling
+        inputs = {"paper_input": f"  paper {i % keys}", "style_input": "Technical",
+                  "length_input": "Short (1-2 paragraphs)"}
+        if coalesce:
+            flights["search"].do(normalize_key(query), search.run, query)
+            flights["prompt"].do(normalize_key(inputs), ask, inputs)
+        else:
+            search.run(query)
+            ask(inputs)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"requests": clients, "search_calls": search.calls, "prompt_calls": len(prompt_calls),
+            "seconds": time.perf_counter() - start}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test single-flight coalescing with stub backends")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=3, help="distinct requests among the clients")
+    parser.add_argument("--latency", type=float, default=0.2, help="backend latency (s)")
+    args = parser.parse_args()
+
+    for coalesce in (False, True):
+        r = load_test(args.clients, args.keys, args.latency, coalesce)
+        print(f"{'single-flight' if coalesce else 'direct':>13}  {r['requests']} requests  "
+              f"search calls {r['search_calls']:4}  prompt calls {r['prompt_calls']:4}  {r['seconds']:.2f}s")
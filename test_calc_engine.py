@@ -0,0 +1,98 @@
+# test_calc_engine.py
+# The expression whitelist in calc_engine: what it accepts, what it
+# rejects, and the function table.
+
+import math
+
+import numpy as np
+import pytest
+
+from calc_engine import FUNCTIONS, ExpressionError, compile_expression, evaluate
+
+
+@pytest.mark.parametrize("text, values, expected", [
+    ("1 + 2 * 3", {}, 7.0),
+    ("-a + +b", {"a": 1, "b": 4}, 3.0),
+    ("7 // 2 + 7 % 2", {}, 4.0),
+    ("2 ** 10", {}, 1024.0),
+    ("pi", {}, math.pi),
+    ("max(a, b) - min(a, b)", {"a": 3, "b": 5}, 2.0),
+])
+def test_allowed_nodes(text, values, expected):
+    assert evaluate(text, **values) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text", [
+    "__import__('os')",             # call of a non-whitelisted name
+    "a.b",                          # attribute access
+    "a[0]",                         # subscript
+    "lambda: 1",
+    "[1, 2]",
+    "'text'",                       # only numbers are allowed
+    "True",
+    "1 if a else 2",
+    "a < b",
+    "a & b",                        # bitwise operators
+    "not a",
+    "sqrt(x=4)",                    # keyword arguments
+    "sqrt",                         # function without a call
+    "(lambda: 1)()",
+    "1 +",                          # syntax error
+    "1" * 600,                      # too long
+])
+def test_rejected_nodes(text):
+    with pytest.raises(ExpressionError):
+        compile_expression(text)
+
+
+FUNCTION_CASES = [
+    ("abs(-2)", 2.0),
+    ("sqrt(16)", 4.0),
+    ("exp(0)", 1.0),
+    ("log(e)", 1.0),
+    ("log10(100)", 2.0),
+    ("sin(0) + cos(0) + tan(0)", 1.0),
+    ("round(3.14159, 2)", 3.14),
+    ("round(2.6)", 3.0),
+    ("floor(2.7) + ceil(2.2)", 5.0),
+    ("in_to_cm(1)", 2.54),
+    ("cm_to_in(2.54)", 1.0),
+    ("f_to_c(212)", 100.0),
+    ("c_to_f(100)", 212.0),
+    ("kg_to_lb(1)", 2.20462),
+    ("lb_to_kg(2.20462)", 1.0),
+    ("pct(200, 15)", 30.0),
+    ("min(1, 2) + max(1, 2)", 3.0),
+]
+
+
+@pytest.mark.parametrize("text, expected", FUNCTION_CASES)
+def test_function_table(text, expected):
+    assert evaluate(text) == pytest.approx(expected)
+
+
+def test_every_function_is_covered():
+    covered = " ".join(text for text, _ in FUNCTION_CASES)
+    assert all(f"{name}(" in covered for name in FUNCTIONS)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("1 / 0", "Division by zero"),
+    ("log(0)", "not finite"),
+    ("sqrt(-1)", "not a number"),
+    ("9 ** 9 ** 9", "too large"),
+    ("a + 1", "Missing value"),
+])
+def test_errors(text, message):
+    with pytest.raises(ExpressionError, match=message):
+        evaluate(text)
+
+
+def test_arrays_give_nan_for_bad_rows():
+    result = compile_expression("a / b").evaluate_array(a=[1.0, 2.0], b=[0.0, 4.0])
+    assert np.isnan(result[0]) and result[1] == 0.5
+
+
+def test_arrays_reject_complex_constants():
+    with pytest.raises(ExpressionError, match="not a real number"):
+        compile_expression("(-8) ** 0.5").evaluate_array(a=[1.0, 2.0])
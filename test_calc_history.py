@@ -0,0 +1,93 @@
+# test_calc_history.py
+# HistoryStore: paging across the in-memory / on-disk boundary, recovery
+# from a torn last line, the flush timer, and history ids.
+
+import time
+
+import pytest
+
+from calc_history import HistoryStore, log_path
+
+
+def texts(entries):
+    return [e["text"] for e in entries]
+
+
+def test_pages_are_newest_first(tmp_path):
+    store = HistoryStore(tmp_path / "h.jsonl")
+    for i in range(5):
+        store.append(f"e{i}")
+    assert texts(store.page(0, 2)) == ["e4", "e3"]
+    assert texts(store.page(2, 2)) == ["e0"]
+    assert store.page(3, 2) == []
+    assert store.page_count(2) == 3
+
+
+def test_paging_across_ring_buffer_boundary(tmp_path):
+    store = HistoryStore(tmp_path / "h.jsonl", max_memory=5, batch_size=3)
+    for i in range(12):
+        store.append(f"e{i}")
+    assert len(store) == 12
+    # Entries e0..e6 are only on disk now; e7..e11 are in memory
+    assert texts(store.page(0, 4)) == ["e11", "e10", "e9", "e8"]
+    assert texts(store.page(1, 4)) == ["e7", "e6", "e5", "e4"]
+    assert texts(store.page(2, 4)) == ["e3", "e2", "e1", "e0"]
+
+
+def test_reload_reads_back_the_log(tmp_path):
+    path = tmp_path / "h.jsonl"
+    store = HistoryStore(path, max_memory=3)
+    for i in range(7):
+        store.append(f"e{i}")
+    store.flush()
+    reloaded = HistoryStore(path, max_memory=3)
+    assert len(reloaded) == 7
+    assert texts(reloaded.page(0, 7)) == [f"e{i}" for i in reversed(range(7))]
+
+
+def test_torn_last_line_is_terminated(tmp_path):
+    path = tmp_path / "h.jsonl"
+    store = HistoryStore(path, batch_size=5)
+    for i in range(10):
+        store.append(f"e{i}")
+    store.flush()
+    with open(path, "ab") as f:
+        f.write(b'{"ts": "x", "te')  # write cut short by a crash
+
+    store = HistoryStore(path, batch_size=5)
+    for i in range(3):
+        store.append(f"n{i}")
+    store.flush()
+    assert len(store) == 14
+
+    reloaded = HistoryStore(path)
+    assert len(reloaded) == 14
+    assert texts(reloaded.page(0, 4))[:3] == ["n2", "n1", "n0"]
+
+
+def test_short_batch_is_flushed_by_timer(tmp_path):
+    path = tmp_path / "h.jsonl"
+    store = HistoryStore(path, batch_size=20, flush_interval=0.05)
+    for i in range(3):
+        store.append(f"e{i}")
+    time.sleep(0.3)
+    assert len(HistoryStore(path)) == 3
+
+
+def test_clear_removes_log(tmp_path):
+    path = tmp_path / "h.jsonl"
+    store = HistoryStore(path, batch_size=1)
+    store.append("e0")
+    store.clear()
+    assert not store
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("user_id", ["", "../etc/passwd", "ABCDEF" * 6, "0" * 31])
+def test_log_path_rejects_bad_ids(user_id):
+    with pytest.raises(ValueError):
+        log_path(user_id)
+
+
+def test_log_path_accepts_uuid_hex(tmp_path):
+    assert log_path("0123456789abcdef" * 2, tmp_path) == str(tmp_path / ("0123456789abcdef" * 2 + ".jsonl"))
@@ -0,0 +1,62 @@
+# test_ingestion.py
+# Format sniffing: binary formats are recognised from magic bytes whatever
+# the file is called, and text files keep their declared extension even when
+# their first bytes look like some other signature.
+
+import io
+import zipfile
+
+import pytest
+
+from ingestion import load_bytes, load_dataframe, sniff_extension
+
+
+def office_zip(part):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr("[Content_Types].xml", "<Types/>")
+        z.writestr(part, "<document/>")
+    return buffer.getvalue()
+
+
+class Upload(io.BytesIO):
+    """Minimal stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+@pytest.mark.parametrize("head, name", [
+    (b"BMI,age,weight\n22.1,30,70\n", "people.csv"),      # "BM" is the bmp signature
+    (b"ID3 tags and their meaning\n", "notes.txt"),        # mp3
+    (b"MZ,region\n1,north\n", "codes.csv"),                # exe
+    (b"GIF89a is an image format\n", "README.md"),         # gif
+    (b'{"id": 1}', "data.json"),
+    (b"plain text", "notes.TXT"),
+])
+def test_text_keeps_declared_extension(head, name):
+    assert sniff_extension(head, name) == "." + name.rsplit(".", 1)[1].lower()
+
+
+@pytest.mark.parametrize("head, name, expected", [
+    (b"%PDF-1.4\n%binary\n", "report.pdf", ".pdf"),
+    (b"%PDF-1.4\n%binary\n", "report.txt", ".pdf"),
+    (office_zip("word/document.xml"), "letter.bin", ".docx"),
+    (office_zip("xl/workbook.xml"), "table.csv", ".xlsx"),
+])
+def test_binary_formats_win_over_name(head, name, expected):
+    assert sniff_extension(head, name) == expected
+
+
+def test_text_with_signature_prefix_loads_as_text():
+    result = load_bytes("notes.txt", b"ID3 tags and their meaning\n")
+    assert result.error is None
+    assert result.extension == ".txt"
+    assert "ID3 tags" in result.documents[0].page_content
+
+
+def test_csv_with_signature_prefix_loads_as_table():
+    df = load_dataframe(Upload("people.csv", b"BMI,age\n22.1,30\n24.5,41\n"))
+    assert list(df.columns) == ["BMI", "age"]
+    assert len(df) == 2
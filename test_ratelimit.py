@@ -0,0 +1,168 @@
+# test_ratelimit.py
+# AdaptiveLimiter against a temporary state file: priority order, AIMD,
+# expiry of rows left by dead processes, the queue timeout, and calls to
+# QuotaFakeChatModel through limited().
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from fake_llm import QuotaFakeChatModel, RateLimitError
+from metrics import Registry
+from ratelimit import AdaptiveLimiter, LimiterTimeout, is_rate_limited, limited
+
+
+def make_limiter(tmp_path, **kwargs):
+    options = {"requests_per_minute": 60_000, "max_concurrency": 1, "initial_concurrency": 1,
+               "registry": Registry()}
+    options.update(kwargs)
+    return AdaptiveLimiter(str(tmp_path / "state.sqlite"), **options)
+
+
+class Status(Exception):
+    def __init__(self, message, **attrs):
+        super().__init__(message)
+        self.__dict__.update(attrs)
+
+
+# --- is_rate_limited ---
+@pytest.mark.parametrize("error, expected", [
+    (RateLimitError("429 Resource has been exhausted"), True),
+    (Status("Too many requests", status_code=429), True),
+    (Status("Service unavailable", status_code=503), True),
+    (Status("quota", code="429"), False),  # only numeric codes count
+    (Exception("400 RESOURCE_EXHAUSTED: quota exceeded"), True),
+    (ValueError("prompt has 14290 tokens, limit is 8192"), False),
+    (Exception("request 5031 failed"), False),
+    (Exception("UNAVAILABLE_FEATURE is not enabled"), False),
+    (Status("bad request", status_code=400), False),
+])
+def test_is_rate_limited(error, expected):
+    assert is_rate_limited(error) is expected
+
+
+def test_is_rate_limited_google_errors():
+    google_errors = pytest.importorskip("google.api_core.exceptions")
+    assert is_rate_limited(google_errors.ResourceExhausted("quota"))
+    assert is_rate_limited(google_errors.ServiceUnavailable("overloaded"))
+    assert not is_rate_limited(google_errors.InvalidArgument("429 tokens is too many"))
+
+
+# --- Admission ---
+def test_interactive_goes_before_batch(tmp_path):
+    limiter = make_limiter(tmp_path)
+    held = limiter.acquire("interactive")
+    order = []
+
+    def client(priority):
+        with limiter.slot(priority):
+            order.append(priority)
+
+    threads = [threading.Thread(target=client, args=(p,)) for p in ("batch", "batch", "interactive")]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)  # queued in this order
+    limiter.release(held)
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "batch", "batch"]
+
+
+def test_unknown_priority(tmp_path):
+    with pytest.raises(ValueError):
+        make_limiter(tmp_path).acquire("urgent")
+    with pytest.raises(ValueError):
+        limited(QuotaFakeChatModel(), "urgent", make_limiter(tmp_path))
+
+
+def test_acquire_times_out(tmp_path):
+    limiter = make_limiter(tmp_path)
+    held = limiter.acquire()
+    start = time.monotonic()
+    with pytest.raises(LimiterTimeout):
+        limiter.acquire(timeout=0.2)
+    assert 0.2 <= time.monotonic() - start < 1.0
+    assert limiter.stats()["queued"] == 0  # gave up its place in line
+    limiter.release(held)
+    limiter.release(limiter.acquire(timeout=0.2))
+
+
+# --- AIMD ---
+def test_throttled_calls_decrease_once_per_cooldown(tmp_path):
+    limiter = make_limiter(tmp_path, max_concurrency=8, initial_concurrency=8, cooldown=0.3)
+    tickets = [limiter.acquire() for _ in range(4)]
+    for ticket in tickets:  # rejected together: one signal
+        limiter.release(ticket, throttled=True)
+    assert limiter.stats()["limit"] == 4
+    time.sleep(0.35)
+    limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.stats()["limit"] == 2
+
+
+def test_successful_calls_increase_by_about_one_per_round(tmp_path):
+    limiter = make_limiter(tmp_path, max_concurrency=8, initial_concurrency=2)
+    for _ in range(2):
+        limiter.release(limiter.acquire())
+    assert limiter.stats()["limit"] == 2.9  # 2 + 1/2 + 1/2.5
+
+
+def test_throttling_is_shared_across_limiters(tmp_path):
+    first = make_limiter(tmp_path, max_concurrency=8, initial_concurrency=8)
+    second = make_limiter(tmp_path, max_concurrency=8, initial_concurrency=8)
+    first.release(first.acquire(), throttled=True)
+    assert second.stats()["limit"] == 4
+
+
+# --- Dead processes ---
+def test_expired_lease_is_reaped(tmp_path):
+    dead = make_limiter(tmp_path, lease_seconds=0.1)
+    dead.acquire()  # never released: its process "died"
+    time.sleep(0.2)
+    alive = make_limiter(tmp_path)
+    alive.release(alive.acquire(timeout=1.0))
+
+
+def test_abandoned_queue_entry_is_reaped(tmp_path):
+    limiter = make_limiter(tmp_path)
+    with sqlite3.connect(limiter.path) as db:  # first in line, owner gone
+        db.execute("INSERT INTO waiting (priority, owner, expires) VALUES (0, 'gone', ?)", (time.time() - 1,))
+    limiter.release(limiter.acquire("batch", timeout=1.0))
+    assert limiter.stats()["queued"] == 0
+
+
+def test_old_state_file_is_upgraded(tmp_path):
+    path = tmp_path / "state.sqlite"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE waiting (id INTEGER PRIMARY KEY AUTOINCREMENT, priority INTEGER NOT NULL, "
+                   "pid INTEGER NOT NULL)")
+        db.execute("CREATE TABLE leases (id INTEGER PRIMARY KEY AUTOINCREMENT, pid INTEGER NOT NULL)")
+        db.execute("INSERT INTO leases (pid) VALUES (1)")
+    limiter = make_limiter(tmp_path)
+    limiter.release(limiter.acquire(timeout=1.0))
+
+
+# --- With a model ---
+def test_limited_model_stays_inside_quota(tmp_path):
+    stub = QuotaFakeChatModel(latency=0.05, max_concurrency=2, requests_per_second=40)
+    limiter = make_limiter(tmp_path, requests_per_minute=40 * 60, max_concurrency=2, initial_concurrency=2,
+                           burst_seconds=1.0)
+    model = limited(stub, "batch", limiter)
+    failures = []
+
+    def client(i):  # 18 calls in all: fewer than the stub allows per second
+        for j in range(3):
+            try:
+                model.invoke(f"request {i}.{j}")
+            except Exception as e:
+                failures.append(e)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+    assert stub.stats() == {"served": 18, "throttled": 0}
+    assert limiter.stats() == {"limit": limiter.stats()["limit"], "in_flight": 0, "queued": 0}
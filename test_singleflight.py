@@ -0,0 +1,106 @@
+# test_singleflight.py
+# SingleFlight: concurrent calls with the same key share one backend call,
+# its exception, and a fresh call when the leader was aborted.
+
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, normalize_key
+
+
+class Stop(BaseException):
+    """Stands in for Streamlit's rerun/stop exceptions."""
+
+
+def run_concurrently(n, target):
+    results, errors = [None] * n, [None] * n
+
+    def client(i):
+        try:
+            results[i] = target(i)
+        except BaseException as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)  # the first thread becomes the leader
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_normalize_key_ignores_case_and_spacing():
+    assert normalize_key("Pakistan  Sports news") == normalize_key(" pakistan sports NEWS")
+    assert normalize_key({"a": "X  y"}) == normalize_key({"a": "x y"})
+    assert normalize_key("a") != normalize_key("b")
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight("test")
+    calls = []
+
+    def backend():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    results, errors = run_concurrently(5, lambda i: flight.do("k", backend))
+    assert results == ["result"] * 5
+    assert errors == [None] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"requests": 5, "coalesced": 4, "backend_calls": 1, "in_flight": 0}
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight("test")
+    results, _ = run_concurrently(3, lambda i: flight.do(i, lambda: time.sleep(0.05) or i))
+    assert results == [0, 1, 2]
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_exception_is_shared():
+    flight = SingleFlight("test")
+
+    def backend():
+        time.sleep(0.2)
+        raise ValueError("backend down")
+
+    _, errors = run_concurrently(3, lambda i: flight.do("k", backend))
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_waiters_retry_when_leader_is_aborted():
+    flight = SingleFlight("test")
+    calls = []
+
+    def backend():
+        calls.append(1)
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise Stop()
+        return "result"
+
+    results, errors = run_concurrently(4, lambda i: flight.do("k", backend))
+    assert isinstance(errors[0], Stop)  # only the aborted session sees its own interrupt
+    assert results[1:] == ["result"] * 3
+    assert errors[1:] == [None] * 3
+    assert len(calls) == 2  # one waiter made the call again for the others
+    assert flight.in_flight() == 0
+
+
+def test_next_call_after_finish_is_not_cached():
+    flight = SingleFlight("test")
+    calls = []
+    flight.do("k", calls.append, 1)
+    flight.do("k", calls.append, 2)
+    assert calls == [1, 2]
+
+
+@pytest.mark.parametrize("coalesce, expected", [(True, 3), (False, 12)])
+def test_load_test_backend_calls(coalesce, expected):
+    from singleflight import load_test
+    report = load_test(clients=12, keys=3, latency=0.2, coalesce=coalesce)
+    assert report["search_calls"] == expected
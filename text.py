@@ -1,33 +1,19 @@
 import streamlit as st
-import os
-import tempfile
-import json
 from dotenv import load_dotenv
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import PromptTemplate
-from langchain_core.documents import Document
-
-from langchain_text_splitters import (
-    CharacterTextSplitter,
-    RecursiveCharacterTextSplitter,
-    MarkdownHeaderTextSplitter,
-    SentenceTransformersTokenTextSplitter
+from ingestion import DOCUMENT_TYPES, ingest_uploads
+from pipeline import (
+    SPLIT_STRATEGIES, SUMMARY_TEMPLATE, format_context, gemini_model, qa_chain,
+    split_docs, summary_chain
 )
+from retrieval import EMBEDDERS, load_or_build
+from metrics import diagnostics_panel, llm_config, timed
 
-from langchain_community.document_loaders import (
-    TextLoader, CSVLoader, PyPDFLoader,
-    UnstructuredWordDocumentLoader, UnstructuredMarkdownLoader
-)
+APP = "text"
 
 # Load environment
 load_dotenv()
 
-# Initialize model
-model = ChatGoogleGenerativeAI(model="gemini-1.5-pro")
-parser = StrOutputParser()
-
 # Streamlit UI
 st.set_page_config(page_title="📄 AI Summarizer", layout="wide")
 st.title("📄 AI File Summarizer with All Text Splitters")
@@ -36,104 +22,57 @@ st.title("📄 AI File Summarizer with All Text Splitters")
 st.sidebar.header("⚙️ Settings")
 split_strategy = st.sidebar.selectbox(
     "Text splitting method",
-    (
-        "None",
-        "Length-Based",
-        "Text Structure-Based",
-        "Document Structure-Based",
-        "Semantic Meaning-Based"
-    )
+    SPLIT_STRATEGIES
 )
 
 chunk_size = st.sidebar.number_input("Chunk size", 10, 4000, step=10)
 chunk_overlap = st.sidebar.number_input("Chunk overlap", 0, 500, step=5)
 
+st.sidebar.header("🔎 Question answering")
+embedder_name = st.sidebar.selectbox("Retrieval embeddings", list(EMBEDDERS))
+top_k = st.sidebar.slider("Chunks sent per question", 1, 10, 4)
+
 custom_prompt = st.text_area(
     "✍️ Enter your prompt",
-    value="Write a summary for the following content:\n\n{poem}",
+    value=SUMMARY_TEMPLATE,
     height=100
 )
 
-uploaded_file = st.file_uploader(
-    "📂 Upload a file (.txt, .csv, .pdf, .docx, .md, .json)",
-    type=["txt", "csv", "pdf", "docx", "md", "json"]
+uploaded_files = st.file_uploader(
+    "📂 Upload files (.txt, .csv, .pdf, .docx, .md, .json)",
+    type=[ext.lstrip(".") for ext in DOCUMENT_TYPES],
+    accept_multiple_files=True
 )
 
-# Load file
-def load_file(path, extension):
-    try:
-        if extension == ".txt":
-            return TextLoader(path, encoding="utf-8").load()
-        elif extension == ".csv":
-            return CSVLoader(path).load()
-        elif extension == ".pdf":
-            return PyPDFLoader(path).load()
-        elif extension == ".docx":
-            return UnstructuredWordDocumentLoader(path).load()
-        elif extension == ".md":
-            return UnstructuredMarkdownLoader(path).load()
-        elif extension == ".json":
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [Document(page_content=json.dumps(data, indent=2))]
-        else:
-            return None
-    except Exception as e:
-        st.error(f"❌ Error loading file: {e}")
-        return None
-
-# Split docs
-def split_docs(docs, strategy, chunk_size, chunk_overlap):
-    if strategy == "Length-Based":
-        splitter = CharacterTextSplitter(
-            separator="\n",
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
-        return splitter.split_documents(docs)
-
-    elif strategy == "Text Structure-Based":
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
-        return splitter.split_documents(docs)
-
-    elif strategy == "Document Structure-Based":
-        splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=[("#", "H1"), ("##", "H2"), ("###", "H3")]
-        )
-        split_output = []
-        for doc in docs:
-            split_output.extend(splitter.split_text(doc.page_content))
-        return split_output
-
-    elif strategy == "Semantic Meaning-Based":
-        splitter = SentenceTransformersTokenTextSplitter(
-            model_name="all-MiniLM-L6-v2",
-            tokens_per_chunk=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
-        return splitter.split_documents(docs)
+@st.cache_resource
+def get_embedder(name):
+    return EMBEDDERS[name]()
 
-    else:
-        return docs
 
 # Main logic
-if uploaded_file is not None:
-    suffix = os.path.splitext(uploaded_file.name)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-        tmp_file.write(uploaded_file.read())
-        tmp_file_path = tmp_file.name
-
-    docs = load_file(tmp_file_path, suffix.lower())
+if uploaded_files:
+    loaded = {}
+    progress = st.progress(0.0, text="📥 Reading files...")
+    with timed("parse_files", APP):
+        for i, result in enumerate(ingest_uploads(uploaded_files), 1):
+            if result.error:
+                st.error(f"❌ Error loading {result.name}: {result.error}")
+            else:
+                loaded[result.index] = result.documents
+            progress.progress(i / len(uploaded_files), text=f"📥 Read {result.name}")
+    progress.empty()
+
+    # Keep the upload order, whatever order the workers finished in
+    docs = [doc for i in range(len(uploaded_files)) for doc in loaded.get(i, [])]
 
     if docs:
-        docs = split_docs(docs, split_strategy, chunk_size, chunk_overlap)
+        with timed("split", APP):
+            docs = split_docs(docs, split_strategy, chunk_size, chunk_overlap)
 
         # Show all extracted content
-        with st.expander("📖 Show extracted content"):
-            st.text("\n\n".join([doc.page_content for doc in docs[:10]]))
+        with timed("render", APP):
+            with st.expander("📖 Show extracted content"):
+                st.text("\n\n".join([doc.page_content for doc in docs[:10]]))
 
         # Page selector
         selected_page = st.sidebar.selectbox(
@@ -151,10 +90,49 @@ if uploaded_file is not None:
         # Summarize
         if st.button("✨ Generate Summary"):
             with st.spinner("Generating..."):
-                prompt = PromptTemplate(template=custom_prompt, input_variables=["poem"])
-                chain = prompt | model | parser
-                response = chain.invoke({"poem": selected_text})
+                # The model (and LangChain) is only loaded once it's needed
+                chain = summary_chain(gemini_model("gemini-1.5-pro"), custom_prompt)
+                st.markdown("### 🧠 Output")
+                # Streamed so time-to-first-token can be measured
+                with timed("generate", APP):
+                    st.write_stream(chain.stream(
+                        {"poem": selected_text},
+                        config=llm_config(APP)
+                    ))
                 st.success("✅ Summary Generated")
-                st.markdown(f"### 🧠 Output\n{response}")
+
+        # Question answering: only the top-k relevant chunks go to Gemini
+        st.subheader("❓ Ask about your files")
+        question = st.text_input("Your question")
+
+        if question and st.button("🔎 Answer"):
+            try:
+                with st.spinner("Finding relevant chunks..."):
+                    with timed("retrieve", APP):
+                        embedder = get_embedder(embedder_name)
+                        index = load_or_build(docs, embedder)
+                        hits = index.query([question], embedder, k=top_k)[0]
+            except ImportError as e:
+                st.error(f"❌ {embedder_name} is not available: {e}")
+                st.stop()
+
+            if not hits:
+                st.warning("No part of the files matches this question.")
+            else:
+                with st.expander(f"📚 {len(hits)} of {len(index)} chunks used"):
+                    for hit in hits:
+                        st.caption(f"Score {hit['score']:.2f}")
+                        st.text(hit["text"][:1000] + ("..." if len(hit["text"]) > 1000 else ""))
+
+                with st.spinner("Generating..."):
+                    chain = qa_chain(gemini_model("gemini-1.5-pro"))
+                    st.markdown("### 💬 Answer")
+                    with timed("generate", APP):
+                        st.write_stream(chain.stream(
+                            {"context": format_context(hits), "question": question},
+                            config=llm_config(APP)
+                        ))
     else:
         st.error("❌ Could not read file.")
+
+diagnostics_panel(APP)